@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+from collections import OrderedDict
+from threading import Lock
+
+
+class ResultCache(object):
+    """
+    Least recently used cache bounded both by number of entries and by the total size of the cached values.
+    Counts hits, misses and evictions so the limits can be tuned from stats().
+    """
+    def __init__(self, max_entries=512, max_size=64 * 1024 * 1024):
+        """
+
+        :param max_entries:
+        :type max_entries: int
+        :param max_size: upper bound for the sum of the sizes passed to put
+        :type max_size: int
+        """
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = Lock()
+
+    def get(self, key):
+        """
+
+        :param key:
+        :return: the cached value, or None on a miss
+        """
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            value, size = self.entries.pop(key)
+            self.entries[key] = (value, size)
+            return value
+
+    def put(self, key, value, size):
+        """
+        Cache value, evicting the least recently used entries until it fits. Values larger than the whole
+        cache are not stored.
+
+        :param key:
+        :param value:
+        :param size: size of value, in the same unit as max_size
+        :type size: int
+        :return: True if value was stored
+        """
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+            if size > self.max_size:
+                return False
+            while len(self.entries) > 0 and \
+                    (len(self.entries) >= self.max_entries or self.size + size > self.max_size):
+                self.size -= self.entries.popitem(last=False)[1][1]
+                self.evictions += 1
+            self.entries[key] = (value, size)
+            self.size += size
+            return True
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """
+
+        :return: counters and current usage
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "size": self.size,
+                "max_entries": self.max_entries,
+                "max_size": self.max_size,
+            }
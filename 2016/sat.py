@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import division, unicode_literals
+import heapq
+from timeit import default_timer
+from forseti.formula import Not, And, Or, If, Iff
+
+
+class Encoding(object):
+    """
+    Tseitin encoding of formulas into clauses. Every compound subformula gets a variable that is equivalent
+    to it, so the clauses grow linearly with the formulas instead of exponentially as in a truth tree.
+    Variables are numbered from 1 and a literal is a variable or its negation.
+    """
+    def __init__(self):
+        self.clauses = []
+        self.atoms = {}
+        self.variables = 0
+
+    def new_variable(self):
+        self.variables += 1
+        return self.variables
+
+    def atom(self, formula):
+        key = repr(formula)
+        if key not in self.atoms:
+            self.atoms[key] = self.new_variable()
+        return self.atoms[key]
+
+    def assert_formula(self, formula):
+        """
+        Add clauses that hold exactly when formula is true
+
+        :param formula:
+        :type formula: Formula
+        """
+        self.clauses.append([self.literal(formula)])
+
+    def literal(self, formula):
+        """
+        Encode formula and everything below it, children before their parent, without recursing
+
+        :param formula:
+        :type formula: Formula
+        :return: literal equivalent to formula
+        :rtype: int
+        """
+        literals = {}
+        stack = [(formula, False)]
+        while len(stack) > 0:
+            current, children_done = stack.pop()
+            if id(current) in literals:
+                continue
+            if not isinstance(current, (Not, And, Or, If, Iff)):
+                literals[id(current)] = self.atom(current)
+                continue
+            if not children_done:
+                stack.append((current, True))
+                for arg in current.args:
+                    stack.append((arg, False))
+                continue
+
+            args = [literals[id(arg)] for arg in current.args]
+            if isinstance(current, Not):
+                literals[id(current)] = -args[0]
+                continue
+            variable = self.new_variable()
+            if isinstance(current, If):
+                args = [-args[0], args[1]]
+            if isinstance(current, And):
+                for arg in args:
+                    self.clauses.append([-variable, arg])
+                self.clauses.append([variable] + [-arg for arg in args])
+            elif isinstance(current, Iff):
+                self.clauses.append([-variable, -args[0], args[1]])
+                self.clauses.append([-variable, args[0], -args[1]])
+                self.clauses.append([variable, args[0], args[1]])
+                self.clauses.append([variable, -args[0], -args[1]])
+            else:
+                self.clauses.append([-variable] + args)
+                for arg in args:
+                    self.clauses.append([variable, -arg])
+            literals[id(current)] = variable
+        return literals[id(formula)]
+
+
+def luby(i):
+    """
+
+    :param i: position in the sequence, starting from 0
+    :type i: int
+    :return: the i-th term of 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ...
+    :rtype: int
+    """
+    size = 1
+    exponent = 0
+    while size < i + 1:
+        exponent += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) // 2
+        exponent -= 1
+        i = i % size
+    return 2 ** exponent
+
+
+class Solver(object):
+    """
+    Conflict driven clause learning: two watched literals for unit propagation, first-UIP learning with
+    non-chronological backjumping, activity based branching with phase saving and Luby restarts.
+    """
+    RESTART_UNIT = 64
+    DECAY = 0.95
+
+    def __init__(self, variables, clauses):
+        """
+
+        :param variables: number of variables, numbered from 1
+        :type variables: int
+        :param clauses:
+        :type clauses: List[List[int]]
+        """
+        self.variables = variables
+        self.values = [0] * (variables + 1)
+        self.levels = [0] * (variables + 1)
+        self.reasons = [None] * (variables + 1)
+        self.phases = [-1] * (variables + 1)
+        self.activity = [0.0] * (variables + 1)
+        self.increment = 1.0
+        self.watches = [[] for i in range(2 * variables + 2)]
+        self.trail = []
+        self.trail_limits = []
+        self.head = 0
+        self.heap = [(0.0, variable) for variable in range(1, variables + 1)]
+        self.decisions = 0
+        self.conflicts = 0
+        self.max_level = 0
+        self.consistent = True
+        for clause in clauses:
+            self.add_clause(clause)
+
+    @staticmethod
+    def watch_index(literal):
+        return 2 * literal if literal > 0 else -2 * literal + 1
+
+    def value(self, literal):
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def add_clause(self, clause):
+        literals = []
+        for literal in clause:
+            if -literal in literals:
+                return
+            if literal not in literals:
+                literals.append(literal)
+        if len(literals) == 0:
+            self.consistent = False
+        elif len(literals) == 1:
+            if self.value(literals[0]) == -1:
+                self.consistent = False
+            elif self.value(literals[0]) == 0:
+                self.assign(literals[0], None)
+        else:
+            self.watches[Solver.watch_index(literals[0])].append(literals)
+            self.watches[Solver.watch_index(literals[1])].append(literals)
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.values[variable] = 1 if literal > 0 else -1
+        self.levels[variable] = len(self.trail_limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assign every literal the current assignment forces
+
+        :return: a clause with all its literals false, or None if there is no conflict
+        """
+        while self.head < len(self.trail):
+            false_literal = -self.trail[self.head]
+            self.head += 1
+            watchers = self.watches[Solver.watch_index(false_literal)]
+            kept = []
+            self.watches[Solver.watch_index(false_literal)] = kept
+            for position, clause in enumerate(watchers):
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], false_literal
+                if self.value(clause[0]) == 1:
+                    kept.append(clause)
+                    continue
+                for i in range(2, len(clause)):
+                    if self.value(clause[i]) != -1:
+                        clause[1], clause[i] = clause[i], false_literal
+                        self.watches[Solver.watch_index(clause[1])].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if self.value(clause[0]) == -1:
+                        kept.extend(watchers[position + 1:])
+                        self.head = len(self.trail)
+                        return clause
+                    self.assign(clause[0], clause)
+        return None
+
+    def analyze(self, conflict):
+        """
+        Resolve the conflict back to the first unique implication point of the current level
+
+        :param conflict: clause with all its literals false
+        :return: the learnt clause, asserting literal first and a literal of the backjump level second, and the
+                 level to backjump to
+        """
+        level = len(self.trail_limits)
+        seen = set()
+        learnt = [None]
+        pending = 0
+        literal = None
+        clause = conflict
+        position = len(self.trail) - 1
+        while True:
+            for other in clause:
+                if other == literal:
+                    continue
+                variable = abs(other)
+                if variable not in seen and self.levels[variable] > 0:
+                    seen.add(variable)
+                    self.bump(variable)
+                    if self.levels[variable] == level:
+                        pending += 1
+                    else:
+                        learnt.append(other)
+            while abs(self.trail[position]) not in seen:
+                position -= 1
+            literal = self.trail[position]
+            position -= 1
+            clause = self.reasons[abs(literal)]
+            pending -= 1
+            if pending == 0:
+                break
+        learnt[0] = -literal
+
+        backjump = 0
+        if len(learnt) > 1:
+            deepest = 1
+            for i in range(2, len(learnt)):
+                if self.levels[abs(learnt[i])] > self.levels[abs(learnt[deepest])]:
+                    deepest = i
+            learnt[1], learnt[deepest] = learnt[deepest], learnt[1]
+            backjump = self.levels[abs(learnt[1])]
+        return learnt, backjump
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            for other in range(1, self.variables + 1):
+                self.activity[other] *= 1e-100
+            self.increment *= 1e-100
+            self.heap = [(-self.activity[other], other) for other in range(1, self.variables + 1)
+                         if self.values[other] == 0]
+            heapq.heapify(self.heap)
+        elif self.values[variable] == 0:
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+
+    def backtrack(self, level):
+        if len(self.trail_limits) <= level:
+            return
+        start = self.trail_limits[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.phases[variable] = self.values[variable]
+            self.values[variable] = 0
+            self.reasons[variable] = None
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+        del self.trail[start:]
+        del self.trail_limits[level:]
+        self.head = len(self.trail)
+
+    def pick_variable(self):
+        while len(self.heap) > 0:
+            variable = heapq.heappop(self.heap)[1]
+            if self.values[variable] == 0:
+                return variable
+        return None
+
+    def solve(self, budget=None):
+        """
+
+        :param budget: object with expired() and allows(decisions, level), see truthtrees.Budget
+        :return: True if the clauses are satisfiable, False if not, None if the budget ran out first
+        :rtype: bool | None
+        """
+        if not self.consistent:
+            return False
+        restarts = 0
+        restart_at = Solver.RESTART_UNIT * luby(restarts)
+        since_restart = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                since_restart += 1
+                if len(self.trail_limits) == 0:
+                    return False
+                learnt, backjump = self.analyze(conflict)
+                self.backtrack(backjump)
+                if len(learnt) == 1:
+                    self.assign(learnt[0], None)
+                else:
+                    self.watches[Solver.watch_index(learnt[0])].append(learnt)
+                    self.watches[Solver.watch_index(learnt[1])].append(learnt)
+                    self.assign(learnt[0], learnt)
+                self.increment /= Solver.DECAY
+                if budget is not None and budget.expired():
+                    return None
+                continue
+
+            if since_restart >= restart_at:
+                restarts += 1
+                restart_at = Solver.RESTART_UNIT * luby(restarts)
+                since_restart = 0
+                self.backtrack(0)
+                continue
+            variable = self.pick_variable()
+            if variable is None:
+                return True
+            if budget is not None and not budget.allows(self.decisions + 1, len(self.trail_limits) + 1):
+                return None
+            self.decisions += 1
+            self.trail_limits.append(len(self.trail))
+            self.max_level = max(self.max_level, len(self.trail_limits))
+            self.assign(variable if self.phases[variable] > 0 else -variable, None)
+
+    def model_value(self, variable):
+        return self.values[variable] > 0
+
+
+class SatResult(object):
+    """
+    Verdict of the sat engine, with an assignment making every premise true and the goal false when the
+    argument is invalid
+    """
+    def __init__(self, valid, countermodel, decisions, stats=None):
+        self.valid = valid
+        self.countermodel = countermodel
+        self.decisions = decisions
+        self.stats = stats
+
+    def is_valid(self):
+        """
+
+        :return: True or False, or None if the budget ran out before a verdict was reached
+        :rtype: bool | None
+        """
+        return self.valid
+
+    def node_count(self):
+        """
+
+        :return: number of decisions the solver made
+        :rtype: int
+        """
+        return self.decisions
+
+
+def check_validity(formulas, goal, stats=None, budget=None):
+    """
+    Decide validity by asking whether the premises together with the negated goal are satisfiable
+
+    :param formulas:
+    :type formulas: List[Formula]
+    :param goal:
+    :type goal: Formula
+    :param stats: a truthtrees.SolverStats to fill in: nodes created counts decisions, max depth the deepest
+                  decision level and branches closed the conflicts
+    :param budget: a truthtrees.Budget, max_nodes limiting decisions and max_depth the decision level
+    :return:
+    :rtype: SatResult
+    """
+    start = default_timer()
+    if budget is not None:
+        budget.start()
+    encoding = Encoding()
+    for formula in formulas:
+        encoding.assert_formula(formula)
+    encoding.assert_formula(Not(goal))
+    solver = Solver(encoding.variables, encoding.clauses)
+    if stats is not None:
+        stats.add_time("encode", default_timer() - start)
+        start = default_timer()
+
+    satisfiable = solver.solve(budget)
+    countermodel = None
+    if satisfiable:
+        countermodel = dict((name, solver.model_value(variable)) for name, variable in encoding.atoms.items())
+    if stats is not None:
+        stats.add_time("search", default_timer() - start)
+        stats.nodes_created += solver.decisions
+        stats.max_depth = max(stats.max_depth, solver.max_level)
+        stats.closures += solver.conflicts
+    return SatResult(None if satisfiable is None else not satisfiable, countermodel, solver.decisions, stats)
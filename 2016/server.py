@@ -1,11 +1,26 @@
 # -*- coding: utf-8 -*-
 
 from __future__ import unicode_literals
-from flask import Flask, Markup, render_template, request
+import gzip
+import hashlib
+import json
+from flask import Flask, jsonify, render_template, request, stream_template
+from markupsafe import Markup, escape
+from cache import ResultCache
 import truthtrees
 
 CLOSED_STRING = "<span style='color: red;'>X</span>"
 FLASK_APP = Flask(__name__)
+# rendered trees keyed on truthtrees.argument_key, sizes in characters of HTML
+RESULT_CACHE = ResultCache(max_entries=512, max_size=64 * 1024 * 1024)
+# past these a submission is shown as an undecided partial tree rather than holding the worker
+MAX_NODES = 20000
+MAX_DEPTH = 500
+DEADLINE = 5.0
+# characters of HTML gathered before a piece of the tree is sent
+CHUNK_SIZE = 16 * 1024
+# /api/solve documents keyed on truthtrees.argument_key, sizes in bytes of JSON
+API_CACHE = ResultCache(max_entries=512, max_size=64 * 1024 * 1024)
 
 
 @FLASK_APP.route("/")
@@ -15,40 +30,212 @@ def index_page():
 
 @FLASK_APP.route("/submit", methods=['POST'])
 def generate_tree():
-    formulas = request.form.getlist('formula[]')
+    formulas = read_formulas(request.form.getlist('formula[]'))
     goal = request.form['goal']
-    i = 0
-    while i < len(formulas):
-        formulas[i] = str(formulas[i]).strip()
-        if len(formulas[i]) == 0:
-            del formulas[i]
-            i -= 1
-        i += 1
     form = Markup(render_template('form.html', formulas=formulas, goal=goal))
 
     try:
-        tree = truthtrees.runner(formulas, goal)
+        premises, goal_formula = truthtrees.parse_argument(formulas, goal)
     except (SyntaxError, TypeError) as exception:
         return render_template('error.html', error=str(exception), form=form)
 
-    tree_render = render_node(tree.root)
+    # the tree is shown with the premises in the order they were submitted, so each order is solved once
+    key = truthtrees.argument_key(premises, goal_formula)
+    cached = RESULT_CACHE.get(key)
+    if cached is None:
+        budget = truthtrees.Budget(MAX_NODES, MAX_DEPTH, DEADLINE)
+        tree = truthtrees.TruthTree(premises, goal_formula, budget=budget)
+        closed = tree.is_valid()
+        # the tree is held for as long as the client takes to read it, so only the compact copy is kept
+        chunks = render_chunks(truthtrees.CompactTree(tree.root, release=True).root)
+        # where a solve runs out of time depends on the machine's load, so only finished trees are kept
+        if closed is not None:
+            chunks = cache_chunks(chunks, key, closed)
+        status = "MISS"
+    else:
+        status = "HIT"
+        chunks, closed = [cached[0]], cached[1]
 
-    return render_template('tree.html', form=form, tree=tree_render, closed=tree.root.is_closed())
+    response = FLASK_APP.response_class(stream_template('tree.html', form=form, tree=chunks, closed=closed))
+    response.headers['X-Cache'] = status
+    return response
 
 
-def render_node(node):
-    children = []
-    for child in node.children:
-        children.append(render_node(child))
+@FLASK_APP.route("/api/solve", methods=['GET', 'POST'])
+def solve_api():
+    formulas = read_formulas(request.values.getlist('formula[]'))
+    goal = request.values.get('goal', '')
+    try:
+        premises, goal_formula = truthtrees.parse_argument(formulas, goal)
+    except (SyntaxError, TypeError) as exception:
+        return jsonify({"error": str(exception)}), 400
+
+    key = truthtrees.argument_key(premises, goal_formula)
+    cached = API_CACHE.get(key)
+    if cached is None:
+        budget = truthtrees.Budget(MAX_NODES, MAX_DEPTH, DEADLINE)
+        tree = truthtrees.TruthTree(premises, goal_formula, budget=budget)
+        body = json.dumps(tree_document(tree), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        cached = (body, gzip.compress(body), hashlib.sha1(body).hexdigest())
+        if tree.is_valid() is not None:
+            API_CACHE.put(key, cached, len(cached[0]) + len(cached[1]))
+        status = "MISS"
+    else:
+        status = "HIT"
+    body, compressed, etag = cached
+
+    # the two encodings are different bytes, so each gets its own tag
+    response = FLASK_APP.response_class(mimetype="application/json")
+    response.vary.add("Accept-Encoding")
+    if "gzip" in request.accept_encodings:
+        etag += "-gzip"
+        response.content_encoding = "gzip"
+        body = compressed
+    response.set_etag(etag)
+    response.headers['X-Cache'] = status
+    # arguments are usually posted, which werkzeug's make_conditional leaves alone
+    if request.if_none_match.contains(etag):
+        response.status_code = 304
+    else:
+        response.set_data(body)
+    return response
+
+
+@FLASK_APP.route("/cache")
+def cache_stats():
+    return jsonify({"submit": RESULT_CACHE.stats(), "api": API_CACHE.stats()})
+
+
+def read_formulas(formulas):
+    """
+
+    :param formulas: premises as submitted
+    :type formulas: List[string_types]
+    :return: the premises stripped, without the empty ones
+    :rtype: List[string_types]
+    """
+    return [formula for formula in (str(formula).strip() for formula in formulas) if len(formula) > 0]
 
+
+def tree_document(tree):
+    """
+    Columnar description of a solved tree for clients that render it themselves. Nodes are numbered in preorder
+    and described by one entry in each node column; formulas are listed node after node, the formulas of node
+    i running from offsets[i] to offsets[i + 1], each one an index into the strings table.
+
+    :param tree:
+    :type tree: truthtrees.TruthTree
+    :return: valid, countermodel, strings, the node columns parent (-1 for the root) and closed (the line
+             number the branch closed on, -1 if it did not), offsets and the formula columns formulas and lines
+             (the line number the formula was broken on, -1 if it was not)
+    :rtype: dict
+    """
+    strings = []
+    interned = {}
+    parents = []
+    closed = []
+    offsets = []
     formulas = []
-    for formula in node.formulas:
-        formulas.append(truthtrees.pretty_print(formula.formula))
-    if node.closed:
-        formulas.append(Markup(CLOSED_STRING))
+    lines = []
+    stack = [(tree.root, -1)]
+    while len(stack) > 0:
+        node, parent = stack.pop()
+        position = len(parents)
+        parents.append(parent)
+        closed.append(node.number if node.closed and node.number is not None else -1)
+        offsets.append(len(formulas))
+        for formula in node.formulas:
+            text = truthtrees.pretty_print(formula.formula)
+            if text not in interned:
+                interned[text] = len(strings)
+                strings.append(text)
+            formulas.append(interned[text])
+            lines.append(formula.number if formula.number is not None else -1)
+        for child in reversed(node.children):
+            stack.append((child, position))
+    offsets.append(len(formulas))
+    return {
+        "valid": tree.is_valid(),
+        "countermodel": tree.countermodel,
+        "strings": strings,
+        "parent": parents,
+        "closed": closed,
+        "offsets": offsets,
+        "formulas": formulas,
+        "lines": lines,
+    }
+
+
+def render_chunks(node):
+    """
+    Render node and everything below it in a single preorder pass, without recursing and without a
+    template per node, yielding the HTML in pieces of about CHUNK_SIZE characters as it goes
+
+    :param node:
+    :type node: truthtrees.TreeNode | truthtrees.CompactNode
+    :return:
+    :rtype: Iterator[Markup]
+    """
+    buffer = []
+    size = 0
+    stack = [node]
+    while len(stack) > 0:
+        current = stack.pop()
+        if isinstance(current, str):
+            buffer.append(current)
+            size += len(current)
+        else:
+            parts = ["<li>\n<div>\n"]
+            for formula in current.formulas:
+                parts.append(escape(truthtrees.pretty_print(formula.formula)))
+                parts.append("<br />\n")
+            if current.closed:
+                parts.append(CLOSED_STRING + "<br />\n")
+            parts.append("</div>\n")
+            children = current.children
+            if len(children) > 0:
+                parts.append("<ul>\n")
+                stack.append("</ul>\n</li>\n")
+                stack.extend(reversed(children))
+            else:
+                parts.append("</li>\n")
+            text = "".join(parts)
+            buffer.append(text)
+            size += len(text)
+        if size >= CHUNK_SIZE:
+            yield Markup("".join(buffer))
+            buffer = []
+            size = 0
+    if len(buffer) > 0:
+        yield Markup("".join(buffer))
 
-    return Markup(render_template('node.html', formulas=formulas, children=children))
 
+def cache_chunks(chunks, key, closed):
+    """
+    Pass chunks through, putting the whole rendering in the result cache once the last one has been sent
+
+    :param chunks: output of render_chunks
+    :param key: see truthtrees.argument_key
+    :param closed: verdict to cache with the rendering
+    """
+    rendered = []
+    for chunk in chunks:
+        rendered.append(chunk)
+        yield chunk
+    html = Markup("".join(rendered))
+    RESULT_CACHE.put(key, (html, closed), len(html))
+
+
+def render_node(node):
+    """
+    Render node and everything below it into one string
+
+    :param node:
+    :type node: truthtrees.TreeNode | truthtrees.CompactNode
+    :return:
+    :rtype: Markup
+    """
+    return Markup("".join(render_chunks(node)))
 
 if __name__ == '__main__':
     FLASK_APP.debug = True
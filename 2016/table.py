@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+from timeit import default_timer
+from forseti.formula import Not, And, Or, If, Iff
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# 2^20 rows of one byte each is a megabyte per column, past that the tableau is usually the better bet
+MAX_ATOMS = 20
+
+
+def available(atoms):
+    """
+
+    :param atoms: number of distinct atoms in the argument
+    :type atoms: int
+    :return: whether the truth table engine can take an argument with that many atoms
+    :rtype: bool
+    """
+    return numpy is not None and atoms <= MAX_ATOMS
+
+
+def compile_formula(formula, atom_ids):
+    """
+    Turn formula into a program evaluating it on whole truth table columns. Subformulas come before the
+    formulas they are part of, so the program runs in a single pass.
+
+    :param formula:
+    :type formula: Formula
+    :param atom_ids: column number of every atom, keyed on its name
+    :type atom_ids: dict
+    :return: one (operation, arguments) pair per subformula; "atom" takes a column number and the others the
+             positions of earlier instructions, the last instruction being formula itself
+    :rtype: List[tuple]
+    """
+    program = []
+    positions = {}
+    stack = [(formula, False)]
+    while len(stack) > 0:
+        current, children_done = stack.pop()
+        if id(current) in positions:
+            continue
+        if not isinstance(current, (Not, And, Or, If, Iff)):
+            positions[id(current)] = len(program)
+            program.append(("atom", atom_ids[repr(current)]))
+            continue
+        if not children_done:
+            stack.append((current, True))
+            for arg in reversed(current.args):
+                stack.append((arg, False))
+            continue
+        operation = type(current).__name__.lower()
+        positions[id(current)] = len(program)
+        program.append((operation, tuple(positions[id(arg)] for arg in current.args)))
+    return program
+
+
+def run_program(program, columns):
+    """
+
+    :param program: output of compile_formula
+    :param columns: truth value of every atom in every row, one boolean array per atom
+    :return: truth value of the compiled formula in every row
+    :rtype: numpy.ndarray
+    """
+    uses = [0] * len(program)
+    for operation, args in program:
+        if operation != "atom":
+            for arg in args:
+                uses[arg] += 1
+
+    values = []
+    for operation, args in program:
+        if operation == "atom":
+            values.append(columns[args])
+            continue
+        operands = [values[arg] for arg in args]
+        if operation == "not":
+            result = ~operands[0]
+        elif operation == "and":
+            result = operands[0] & operands[1]
+        elif operation == "or":
+            result = operands[0] | operands[1]
+        elif operation == "if":
+            result = ~operands[0] | operands[1]
+        else:
+            result = operands[0] == operands[1]
+        # let go of each column as soon as nothing else needs it
+        for arg in args:
+            uses[arg] -= 1
+            if uses[arg] == 0:
+                values[arg] = None
+        values.append(result)
+    return values[-1]
+
+
+class TableResult(object):
+    """
+    Verdict of the truth table engine, with the first row making every premise true and the goal false when
+    the argument is invalid
+    """
+    def __init__(self, valid, countermodel, rows, stats=None):
+        self.valid = valid
+        self.countermodel = countermodel
+        self.rows = rows
+        self.stats = stats
+
+    def is_valid(self):
+        return self.valid
+
+    def node_count(self):
+        """
+
+        :return: number of rows in the truth table
+        :rtype: int
+        """
+        return self.rows
+
+
+def check_validity(formulas, goal, atoms, stats=None):
+    """
+    Decide validity by evaluating the premises and the negated goal on every row of the truth table at once
+
+    :param formulas:
+    :type formulas: List[Formula]
+    :param goal:
+    :type goal: Formula
+    :param atoms: names of the atoms in the argument, at most MAX_ATOMS of them
+    :type atoms: List[string_types]
+    :param stats: a truthtrees.SolverStats, only the compile and evaluate phase times are filled in
+    :return:
+    :rtype: TableResult
+    """
+    if not available(len(atoms)):
+        raise ValueError("The table engine needs numpy and at most %d atoms" % MAX_ATOMS)
+    start = default_timer()
+    atom_ids = dict((name, atom_id) for atom_id, name in enumerate(atoms))
+    programs = [compile_formula(formula, atom_ids) for formula in formulas]
+    programs.append(compile_formula(Not(goal), atom_ids))
+    if stats is not None:
+        stats.add_time("compile", default_timer() - start)
+        start = default_timer()
+
+    rows = numpy.arange(1 << len(atoms), dtype=numpy.uint32)
+    columns = [((rows >> atom_id) & 1).astype(bool) for atom_id in range(len(atoms))]
+    counterexamples = numpy.ones(len(rows), dtype=bool)
+    for program in programs:
+        counterexamples &= run_program(program, columns)
+    found = numpy.flatnonzero(counterexamples)
+    countermodel = None
+    if len(found) > 0:
+        row = int(found[0])
+        countermodel = dict((name, bool(row >> atom_id & 1)) for name, atom_id in atom_ids.items())
+    if stats is not None:
+        stats.add_time("evaluate", default_timer() - start)
+    return TableResult(countermodel is None, countermodel, len(rows), stats)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the argument families in benchmarks.families are shared with the benchmarks at the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
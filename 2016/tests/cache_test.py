@@ -0,0 +1,46 @@
+import unittest
+from cache import ResultCache
+
+
+class TestResultCache(unittest.TestCase):
+    def test_hit_and_miss(self):
+        cache = ResultCache()
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", "tree", 4)
+        self.assertEqual(cache.get("a"), "tree")
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["size"], 4)
+
+    def test_evicts_least_recently_used(self):
+        cache = ResultCache(max_entries=2)
+        cache.put("a", 1, 1)
+        cache.put("b", 2, 1)
+        cache.get("a")
+        cache.put("c", 3, 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_size_limit(self):
+        cache = ResultCache(max_size=10)
+        cache.put("a", 1, 6)
+        cache.put("b", 2, 6)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["size"], 6)
+        self.assertFalse(cache.put("c", 3, 11))
+        self.assertIsNone(cache.get("c"))
+
+    def test_replace(self):
+        cache = ResultCache()
+        cache.put("a", 1, 5)
+        cache.put("a", 2, 3)
+        self.assertEqual(cache.get("a"), 2)
+        self.assertEqual(cache.stats()["size"], 3)
+        self.assertEqual(cache.stats()["evictions"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
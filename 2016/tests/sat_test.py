@@ -0,0 +1,76 @@
+import unittest
+import sat
+import truthtrees
+from benchmarks.families import implication_chain, pigeonhole
+
+
+class TestEncoding(unittest.TestCase):
+    def test_atoms_shared(self):
+        encoding = sat.Encoding()
+        encoding.assert_formula(truthtrees.forseti.parser.parse("and(A, or(A, not(B)))"))
+        self.assertEqual(sorted(encoding.atoms), ["A", "B"])
+        self.assertEqual(encoding.variables, 4)
+
+    def test_deep_formula(self):
+        premises, goal = implication_chain(3000)
+        formulas, goal = truthtrees.parse_argument(premises, goal)
+        conjunction = formulas[-1]
+        for formula in reversed(formulas[:-1]):
+            conjunction = truthtrees.And(formula, conjunction)
+        self.assertTrue(sat.check_validity([conjunction], goal).is_valid())
+
+
+class TestSolver(unittest.TestCase):
+    def test_satisfiable(self):
+        clauses = [[1, 2], [-1, 3], [-2, -3], [-3, 2, 1]]
+        solver = sat.Solver(3, clauses)
+        self.assertTrue(solver.solve())
+        for clause in clauses:
+            self.assertTrue(any(solver.model_value(abs(literal)) == (literal > 0) for literal in clause))
+
+    def test_unsatisfiable(self):
+        self.assertFalse(sat.Solver(2, [[1, 2], [-1, 2], [1, -2], [-1, -2]]).solve())
+        self.assertFalse(sat.Solver(1, [[1], [-1]]).solve())
+        self.assertFalse(sat.Solver(1, [[]]).solve())
+
+    def test_luby(self):
+        self.assertEqual([sat.luby(i) for i in range(15)], [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8])
+
+
+class TestCheckValidity(unittest.TestCase):
+    def test_same_verdict_as_tree(self):
+        arguments = [
+            (["if(A, B)", "A"], "B"),
+            (["if(A, B)", "B"], "A"),
+            (["A"], "A"),
+            (["or(A, B)", "if(A, C)", "if(B, C)"], "C"),
+            (["iff(A, B)", "not(and(B, C))"], "not(and(A, C))"),
+            (["or(A, B)", "not(iff(A, B))"], "and(A, B)"),
+        ]
+        for premises, goal in arguments:
+            tree = truthtrees.runner(premises, goal)
+            result = truthtrees.runner(premises, goal, engine="sat")
+            self.assertEqual(tree.is_valid(), result.is_valid())
+
+    def test_countermodel(self):
+        result = truthtrees.runner(["or(A, B)", "if(A, C)"], "C", engine="sat")
+        self.assertFalse(result.is_valid())
+        self.assertEqual(result.countermodel, {"A": False, "B": True, "C": False})
+
+    def test_pigeonhole(self):
+        result = truthtrees.runner(*pigeonhole(5), engine="sat")
+        self.assertTrue(result.is_valid())
+        self.assertIsNone(result.countermodel)
+
+    def test_budget(self):
+        self.assertIsNone(truthtrees.runner(*pigeonhole(5), engine="sat", max_nodes=3).is_valid())
+
+    def test_stats(self):
+        result = truthtrees.runner(*pigeonhole(4), engine="sat", stats=True)
+        self.assertEqual(result.stats.nodes_created, result.node_count())
+        self.assertTrue(result.stats.closures > 0)
+        self.assertIn("encode", result.stats.phases)
+
+
+if __name__ == "__main__":
+    unittest.main()
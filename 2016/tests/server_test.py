@@ -0,0 +1,164 @@
+import gzip
+import unittest
+import server
+import truthtrees
+from benchmarks.families import disjunctions, implication_chain
+
+
+class TestRenderNode(unittest.TestCase):
+    def test_render_node(self):
+        tree = truthtrees.runner(["or(A, B)"], "A")
+        with server.FLASK_APP.test_request_context():
+            html = server.render_node(tree.root)
+        self.assertEqual(html.count("<li>"), 3)
+        self.assertEqual(html.count(server.CLOSED_STRING), 1)
+        self.assertTrue(html.index("(A ∨ B)") < html.index("¬A") < html.index("B<br />"))
+
+    def test_render_deep_tree(self):
+        premises, goal = implication_chain(2000)
+        tree = truthtrees.runner(premises, goal)
+        with server.FLASK_APP.test_request_context():
+            html = server.render_node(tree.root)
+        self.assertEqual(html.count("<li>"), tree.node_count())
+
+    def test_render_compact_tree(self):
+        tree = truthtrees.runner(["or(A, B)", "if(A, C)"], "C")
+        with server.FLASK_APP.test_request_context():
+            html = server.render_node(tree.root)
+            compact = truthtrees.CompactTree(tree.root, release=True)
+            self.assertEqual(server.render_node(compact.root), html)
+        self.assertEqual(tree.root.children, [])
+        self.assertEqual(html.count("<li>"), len(compact))
+
+
+class TestSubmit(unittest.TestCase):
+    def setUp(self):
+        server.RESULT_CACHE.clear()
+        self.client = server.FLASK_APP.test_client()
+
+    def submit(self, formulas, goal):
+        # the tree is streamed, reading the whole body is what finishes the request
+        response = self.client.post("/submit", data={"formula[]": formulas, "goal": goal})
+        response.get_data()
+        response.close()
+        return response
+
+    def test_repeated_submission_is_cached(self):
+        first = self.submit(["if(A, B)", "A", ""], "B")
+        second = self.submit(["if(A,B)", " A"], "B")
+        self.assertEqual(first.headers["X-Cache"], "MISS")
+        self.assertEqual(second.headers["X-Cache"], "HIT")
+        self.assertIn("Argument is valid", second.get_data(as_text=True))
+        stats = self.client.get("/cache").get_json()
+        self.assertEqual(stats["submit"]["entries"], 1)
+        self.assertTrue(stats["submit"]["hits"] >= 1)
+        self.assertIn("evictions", stats["api"])
+
+    def test_premises_shown_in_submitted_order(self):
+        first = self.submit(["A", "if(A, B)"], "B").get_data(as_text=True)
+        second = self.submit(["if(A, B)", "A"], "B")
+        self.assertEqual(second.headers["X-Cache"], "MISS")
+        second = second.get_data(as_text=True)
+        self.assertTrue(first.index("A<br />") < first.index("(A → B)"))
+        self.assertTrue(second.index("(A → B)") < second.index("A<br />"))
+
+    def test_different_goal_is_not_cached(self):
+        self.submit(["if(A, B)", "A"], "B")
+        response = self.submit(["if(A, B)", "A"], "A")
+        self.assertEqual(response.headers["X-Cache"], "MISS")
+
+    def test_budget_exhausted(self):
+        max_nodes = server.MAX_NODES
+        server.MAX_NODES = 50
+        try:
+            premises = disjunctions(8)[0]
+            first = self.submit(premises, "A")
+            second = self.submit(premises, "A")
+        finally:
+            server.MAX_NODES = max_nodes
+        self.assertIn("Argument is undecided", first.get_data(as_text=True))
+        self.assertEqual(second.headers["X-Cache"], "MISS")
+
+    def test_streamed_in_chunks(self):
+        chunk_size = server.CHUNK_SIZE
+        server.CHUNK_SIZE = 64
+        try:
+            response = self.client.post("/submit", data={"formula[]": ["or(A, B)", "if(A, C)"], "goal": "C"})
+            self.assertTrue(response.is_streamed)
+            chunks = list(response.response)
+            response.close()
+        finally:
+            server.CHUNK_SIZE = chunk_size
+        self.assertTrue(len(chunks) > 3)
+        html = b"".join(chunks).decode("utf-8")
+        self.assertEqual(html.count("<li>"), truthtrees.runner(["or(A, B)", "if(A, C)"], "C").node_count())
+        self.assertIn("(A → C)", html)
+        self.assertEqual(self.submit(["or(A, B)", "if(A, C)"], "C").headers["X-Cache"], "HIT")
+
+    def test_formulas_escaped(self):
+        with server.FLASK_APP.test_request_context():
+            html = server.render_node(truthtrees.runner(["and(A, B)"], "A").root)
+        self.assertIsInstance(html, server.Markup)
+        self.assertEqual(html.count("<li>"), html.count("</li>"))
+        self.assertEqual(html.count("<ul>"), html.count("</ul>"))
+
+    def test_syntax_error(self):
+        response = self.submit(["and(A"], "B")
+        self.assertIn("EXCEPTION RAISED", response.get_data(as_text=True))
+
+
+class TestSolveApi(unittest.TestCase):
+    def setUp(self):
+        server.API_CACHE.clear()
+        self.client = server.FLASK_APP.test_client()
+
+    def solve(self, formulas, goal, headers=None):
+        return self.client.post("/api/solve", data={"formula[]": formulas, "goal": goal}, headers=headers)
+
+    def test_document(self):
+        response = self.solve(["or(A, B)", "if(A, C)"], "C")
+        self.assertEqual(response.mimetype, "application/json")
+        document = response.get_json()
+        self.assertFalse(document["valid"])
+        self.assertEqual(document["parent"], [-1, 0, 1, 1, 0, 4, 4])
+        self.assertEqual(len(document["offsets"]), len(document["parent"]) + 1)
+        self.assertEqual(len(document["formulas"]), document["offsets"][-1])
+        self.assertEqual(len(document["lines"]), len(document["formulas"]))
+        self.assertEqual(len(set(document["strings"])), len(document["strings"]))
+        root = [document["strings"][i] for i in document["formulas"][:document["offsets"][1]]]
+        self.assertEqual(root, ["(A ∨ B)", "(A → C)", "¬C"])
+        closed = [number for number in document["closed"] if number >= 0]
+        self.assertEqual(len(closed), 3)
+        self.assertEqual(document["countermodel"], {"A": False, "B": True, "C": False})
+
+    def test_gzip(self):
+        plain = self.solve(["if(A, B)", "A"], "B")
+        compressed = self.solve(["if(A, B)", "A"], "B", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(compressed.content_encoding, "gzip")
+        self.assertEqual(gzip.decompress(compressed.get_data()), plain.get_data())
+        self.assertNotEqual(compressed.headers["ETag"], plain.headers["ETag"])
+        self.assertIn("Accept-Encoding", compressed.headers["Vary"])
+
+    def test_etag(self):
+        before = self.client.get("/cache").get_json()["api"]
+        first = self.solve(["if(A, B)", "A"], "B")
+        self.assertEqual(first.headers["X-Cache"], "MISS")
+        second = self.solve(["if(A,B)", "A"], "B", headers={"If-None-Match": first.headers["ETag"]})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.headers["X-Cache"], "HIT")
+        self.assertEqual(second.get_data(), b"")
+        stats = self.client.get("/cache").get_json()["api"]
+        self.assertEqual(stats["entries"], 1)
+        self.assertEqual((stats["hits"] - before["hits"], stats["misses"] - before["misses"]), (1, 1))
+        third = self.client.get("/api/solve", query_string={"formula[]": ["if(A, B)", "A"], "goal": "A"},
+                                headers={"If-None-Match": first.headers["ETag"]})
+        self.assertEqual(third.status_code, 200)
+
+    def test_syntax_error(self):
+        response = self.solve(["and(A"], "B")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.get_json())
+
+
+if __name__ == "__main__":
+    unittest.main()
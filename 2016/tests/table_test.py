@@ -0,0 +1,61 @@
+import unittest
+from benchmarks.families import disjunctions
+import table
+import truthtrees
+
+
+class TestCompile(unittest.TestCase):
+    def test_program(self):
+        formula = truthtrees.forseti.parser.parse("if(A, and(B, not(A)))")
+        program = table.compile_formula(formula, {"A": 0, "B": 1})
+        self.assertEqual(program, [("atom", 0), ("atom", 1), ("atom", 0), ("not", (2,)), ("and", (1, 3)),
+                                   ("if", (0, 4))])
+
+    def test_shared_subformula(self):
+        shared = truthtrees.Not(truthtrees.Symbol("A"))
+        program = table.compile_formula(truthtrees.Or(shared, shared), {"A": 0})
+        self.assertEqual(program, [("atom", 0), ("not", (0,)), ("or", (1, 1))])
+
+
+@unittest.skipUnless(table.numpy is not None, "numpy is not installed")
+class TestCheckValidity(unittest.TestCase):
+    ARGUMENTS = [
+        (["if(A, B)", "A"], "B"),
+        (["if(A, B)", "B"], "A"),
+        (["A"], "A"),
+        (["or(A, B)", "if(A, C)", "if(B, C)"], "C"),
+        (["iff(A, B)", "not(and(B, C))"], "not(and(A, C))"),
+        (["or(A, B)", "not(iff(A, B))"], "and(A, B)"),
+        (["iff(A, iff(B, C))"], "iff(C, iff(B, A))"),
+    ]
+
+    def test_same_verdict_as_tree(self):
+        for premises, goal in TestCheckValidity.ARGUMENTS:
+            tree = truthtrees.runner(premises, goal)
+            result = truthtrees.runner(premises, goal, engine="table")
+            self.assertEqual(tree.is_valid(), result.is_valid())
+
+    def test_countermodel(self):
+        result = truthtrees.runner(["or(A, B)", "if(A, C)", "D"], "C", engine="table")
+        self.assertFalse(result.is_valid())
+        self.assertEqual(result.countermodel, {"A": False, "B": True, "C": False, "D": True})
+        self.assertEqual(result.node_count(), 16)
+
+    def test_auto(self):
+        small = truthtrees.runner(["or(A, B)"], "A", engine="auto")
+        self.assertIsInstance(small, table.TableResult)
+        premises = disjunctions(11)[0]
+        large = truthtrees.runner(premises, "A", engine="auto", max_nodes=100)
+        self.assertIsInstance(large, truthtrees.TruthTree)
+
+    def test_too_many_atoms(self):
+        premises = disjunctions(11)[0]
+        self.assertRaises(ValueError, truthtrees.runner, premises, "A", None, "table")
+
+    def test_stats(self):
+        result = truthtrees.runner(["or(A, B)"], "A", engine="table", stats=True)
+        self.assertEqual(sorted(result.stats.phases), ["compile", "evaluate", "parse"])
+
+
+if __name__ == "__main__":
+    unittest.main()
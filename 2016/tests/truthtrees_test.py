@@ -0,0 +1,520 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import unittest
+from benchmarks.families import disjunctions, implication_chain
+import truthtrees
+
+
+class TestBranchIndex(unittest.TestCase):
+    def test_add_and_lookup(self):
+        index = truthtrees.BranchIndex()
+        for i in range(2000):
+            index = index.add("A%d" % i)
+        self.assertEqual(len(index), 2000)
+        self.assertTrue("A0" in index)
+        self.assertTrue("A1999" in index)
+        self.assertFalse("A2000" in index)
+
+    def test_add_existing_key(self):
+        index = truthtrees.BranchIndex().add("A")
+        self.assertIs(index.add("A"), index)
+
+    def test_parent_index_unchanged(self):
+        parent = truthtrees.BranchIndex().add("A")
+        left = parent.add("B")
+        right = parent.add("not(B)")
+        self.assertFalse("B" in parent)
+        self.assertTrue("B" in left)
+        self.assertFalse("B" in right)
+        self.assertTrue("A" in right)
+
+
+class TestClosure(unittest.TestCase):
+    def test_modus_ponens(self):
+        tree = truthtrees.runner(["if(A, B)", "A"], "B")
+        self.assertTrue(tree.root.is_closed())
+
+    def test_affirming_consequent(self):
+        tree = truthtrees.runner(["if(A, B)", "B"], "A")
+        self.assertFalse(tree.root.is_closed())
+
+    def test_contradictory_root(self):
+        tree = truthtrees.runner(["A", "or(B, C)"], "A")
+        self.assertTrue(tree.is_valid())
+        self.assertEqual(tree.root.number, 1)
+        self.assertEqual(tree.node_count(), 1)
+        self.assertTrue(truthtrees.runner(["A"], "A", engine="dfs").is_valid())
+
+    def test_branches_do_not_share_formulas(self):
+        tree = truthtrees.runner(["or(A, B)"], "A")
+        left, right = tree.root.children
+        self.assertTrue(left.closed)
+        self.assertFalse(right.closed)
+        self.assertFalse(right.has_formula(truthtrees.Symbol("A")))
+        self.assertTrue(right.has_formula(truthtrees.Not(truthtrees.Symbol("A"))))
+
+
+class TestLiteralBitsets(unittest.TestCase):
+    def test_atom_table(self):
+        atoms = truthtrees.AtomTable()
+        atoms.register(truthtrees.forseti.parser.parse("or(B, and(A, not(B)))"))
+        self.assertEqual(atoms.names, ["B", "A"])
+        self.assertEqual(atoms.literal(truthtrees.Not(truthtrees.Symbol("A"))), (2, False))
+        self.assertEqual(atoms.literal(truthtrees.Symbol("C")), (4, True))
+        self.assertIsNone(atoms.literal(truthtrees.forseti.parser.parse("not(not(A))")))
+        self.assertEqual(atoms.model(5), {"B": True, "A": False, "C": True})
+
+    def test_literals_kept_out_of_index(self):
+        tree = truthtrees.runner(["and(A, not(B))"], "C")
+        self.assertEqual(len(tree.root.index), 1)
+        self.assertTrue(tree.root.has_formula(truthtrees.Symbol("A")))
+        self.assertTrue(tree.root.has_formula(truthtrees.Not(truthtrees.Symbol("B"))))
+        self.assertFalse(tree.root.has_formula(truthtrees.Symbol("B")))
+        self.assertEqual(tree.root.positive & tree.root.negative, 0)
+
+    def test_countermodel(self):
+        for engine in ("tree", "dfs"):
+            result = truthtrees.runner(["or(A, B)", "if(A, C)", "D"], "C", engine=engine)
+            self.assertEqual(result.countermodel, {"A": False, "B": True, "C": False, "D": True})
+        self.assertIsNone(truthtrees.runner(["if(A, B)", "A"], "B").countermodel)
+
+    def test_fork(self):
+        tree = truthtrees.runner(["or(A, B)"], "C")
+        left = tree.root.children[0]
+        fork = left.fork()
+        self.assertIsNone(fork.parent)
+        self.assertEqual(fork.formulas, [])
+        self.assertTrue(fork.has_formula(truthtrees.Symbol("A")))
+        self.assertEqual(fork.depth, left.depth)
+
+
+class TestExpandTree(unittest.TestCase):
+    def test_tree_is_done(self):
+        tree = truthtrees.runner(["and(A, or(iff(not(C), not(A)), not(B)))"],
+                                 "iff(and(not(A), not(C)), and(B, C))")
+        self.assertTrue(tree.is_done())
+        self.assertFalse(tree.root.is_closed())
+
+    def test_same_tree_as_expand_node(self):
+        tree = truthtrees.runner(["or(A, B)", "if(A, C)"], "C")
+        root = truthtrees.TreeNode()
+        for formula in tree.root.formulas:
+            root.append_formula(truthtrees.TreeFormula(formula.formula))
+        stepped = truthtrees.TruthTree.from_root(root)
+        while not stepped.is_done():
+            stepped.expand_node(stepped.root)
+        self.assertFalse(tree.root.is_closed())
+        self.assertEqual(stepped.count, tree.count)
+        self.assertEqual(repr([node.formulas for node in stepped.root.get_children()]),
+                         repr([node.formulas for node in tree.root.get_children()]))
+
+    def test_predicates_are_literals(self):
+        tree = truthtrees.runner(["P(a)", "or(A, B)"], "C")
+        open_leaves = [leaf for leaf in tree.root.get_children() if not leaf.is_closed()]
+        self.assertEqual(tree.open_leaves, 2)
+        self.assertEqual(len(open_leaves), 2)
+        self.assertFalse(truthtrees.TreeFormula(truthtrees.forseti.parser.parse("not(P(a))")).can_break())
+
+
+class TestNaryConnectives(unittest.TestCase):
+    def test_flatten(self):
+        formula = truthtrees.forseti.parser.parse("and(and(A, B), and(C, or(D, E)))")
+        self.assertEqual(repr(truthtrees.flatten(formula, truthtrees.And)), "[A, B, C, or(D, E)]")
+        self.assertEqual(repr(truthtrees.flatten(formula, truthtrees.Or)), "[and(and(A, B), and(C, or(D, E)))]")
+
+    def test_conjunction_in_one_step(self):
+        tree = truthtrees.runner(["and(A, and(B, and(C, D)))"], "D")
+        self.assertTrue(tree.is_valid())
+        self.assertEqual(tree.node_count(), 1)
+        self.assertEqual(repr(tree.root.formulas), "[and(A, and(B, and(C, D))), not(D), A, B, C, D]")
+
+    def test_disjunction_splits_n_ways(self):
+        tree = truthtrees.runner(["or(A, or(B, or(C, D)))", "not(A)", "not(B)", "not(C)"], "D")
+        self.assertTrue(tree.is_valid())
+        self.assertEqual(len(tree.root.children), 4)
+        self.assertEqual(tree.node_count(), 5)
+
+    def test_negated_chains(self):
+        tree = truthtrees.runner(["not(or(A, or(B, C)))"], "not(C)")
+        self.assertEqual(repr(tree.root.formulas), "[not(or(A, or(B, C))), not(not(C)), not(A), not(B), not(C), C]")
+        tree = truthtrees.runner(["not(and(A, and(B, C)))", "A", "B"], "not(C)")
+        self.assertTrue(tree.is_valid())
+        self.assertEqual(len(tree.root.children), 3)
+
+    def test_open_leaves_counted(self):
+        tree = truthtrees.runner(["or(A, or(B, C))", "or(D, E)"], "F")
+        self.assertEqual(tree.open_leaves, 6)
+        self.assertEqual(len(tree.root.get_children()), 6)
+
+
+class TestStrategies(unittest.TestCase):
+    def test_alpha_first_breaks_and_before_or(self):
+        premises = ["or(C, D)", "and(A, not(A))"]
+        original = truthtrees.runner(premises, "B", "original")
+        alpha = truthtrees.runner(premises, "B", "alpha")
+        self.assertTrue(original.root.is_closed())
+        self.assertTrue(alpha.root.is_closed())
+        self.assertEqual(original.node_count(), 3)
+        self.assertEqual(alpha.node_count(), 1)
+
+    def test_same_verdict(self):
+        arguments = [
+            (["if(A, B)", "if(B, C)", "or(A, not(C))"], "C"),
+            (["iff(A, B)", "not(and(B, C))"], "not(and(A, C))"),
+            (["or(A, B)", "not(iff(A, B))"], "and(A, B)"),
+        ]
+        for premises, goal in arguments:
+            original = truthtrees.runner(premises, goal, "original")
+            alpha = truthtrees.runner(premises, goal, truthtrees.AlphaFirst())
+            self.assertEqual(original.root.is_closed(), alpha.root.is_closed())
+
+    def test_lookahead_picks_closing_disjunction(self):
+        premises = disjunctions(6)[0] + ["or(A, B)", "not(A)"]
+        original = truthtrees.runner(premises, "B", "original")
+        lookahead = truthtrees.runner(premises, "B", "lookahead")
+        self.assertTrue(original.root.is_closed())
+        self.assertTrue(lookahead.root.is_closed())
+        self.assertEqual(original.node_count(), 255)
+        self.assertEqual(lookahead.node_count(), 3)
+
+    def test_lookahead_same_verdict(self):
+        arguments = [
+            (["if(A, B)", "if(B, C)", "or(A, not(C))"], "C"),
+            (["or(A, B)", "if(A, C)", "if(B, C)"], "C"),
+            (["or(A, B)", "not(iff(A, B))"], "and(A, B)"),
+        ]
+        for premises, goal in arguments:
+            original = truthtrees.runner(premises, goal)
+            lookahead = truthtrees.runner(premises, goal, "lookahead")
+            self.assertEqual(original.root.is_closed(), lookahead.root.is_closed())
+
+    def test_unknown_strategy(self):
+        self.assertRaises(ValueError, truthtrees.runner, ["A"], "A", "random")
+
+
+class TestCheckValidity(unittest.TestCase):
+    def test_same_verdict_as_tree(self):
+        arguments = [
+            (["if(A, B)", "A"], "B"),
+            (["if(A, B)", "B"], "A"),
+            (["or(A, B)", "if(A, C)", "if(B, C)"], "C"),
+            (["iff(A, B)", "not(and(B, C))"], "not(and(A, C))"),
+            (["or(A, B)", "not(iff(A, B))"], "and(A, B)"),
+        ]
+        for premises, goal in arguments:
+            tree = truthtrees.runner(premises, goal)
+            result = truthtrees.runner(premises, goal, engine="dfs")
+            self.assertEqual(tree.is_valid(), result.is_valid())
+
+    def test_stops_at_first_open_branch(self):
+        premises = disjunctions(20)[0]
+        result = truthtrees.runner(premises, "A", engine="dfs")
+        self.assertFalse(result.is_valid())
+        self.assertEqual(result.node_count(), 41)
+
+    def test_unknown_engine(self):
+        self.assertRaises(ValueError, truthtrees.runner, ["A"], "A", None, "bfs")
+
+
+class TestParallel(unittest.TestCase):
+    def test_same_tree_as_sequential(self):
+        arguments = [
+            (["or(P0, Q0)", "or(P1, Q1)", "or(P2, Q2)", "iff(A, B)"], "and(A, B)"),
+            (["or(P0, Q0)", "or(P1, Q1)", "or(A, B)", "not(A)", "not(B)"], "C"),
+        ]
+        for premises, goal in arguments:
+            sequential = truthtrees.runner(premises, goal)
+            parallel = truthtrees.runner(premises, goal, workers=2)
+            self.assertEqual(sequential.is_valid(), parallel.is_valid())
+            self.assertEqual(sequential.node_count(), parallel.node_count())
+            self.assertEqual(repr([node.formulas for node in sequential.root.get_children()]),
+                             repr([node.formulas for node in parallel.root.get_children()]))
+            self.assertTrue(parallel.is_done())
+
+    def test_summaries_only(self):
+        arguments = [
+            (["or(P0, Q0)", "or(P1, Q1)", "or(A, B)", "not(A)", "not(B)"], "C"),
+            (["or(P0, Q0)", "or(P1, Q1)", "or(P2, Q2)", "if(A, B)"], "or(P0, B)"),
+        ]
+        for premises, goal in arguments:
+            sequential = truthtrees.runner(premises, goal)
+            parallel = truthtrees.runner(premises, goal, workers=2, full_tree=False)
+            self.assertTrue(len(parallel.branches) > 0)
+            self.assertTrue(all(branch[0] is None for branch in parallel.branches.values()))
+            self.assertEqual(sequential.is_valid(), parallel.is_valid())
+            self.assertEqual(sequential.node_count(), parallel.node_count())
+            self.assertEqual(sequential.depth(), parallel.depth())
+            self.assertEqual(sequential.open_leaves, parallel.open_leaves)
+            self.assertEqual(sequential.countermodel, parallel.countermodel)
+
+    def test_subtrees_grafted_when_root_is_read(self):
+        parallel = truthtrees.runner(["or(P0, Q0)", "or(P1, Q1)", "or(A, B)"], "C", workers=2)
+        self.assertTrue(len(parallel.branches) > 0)
+        nodes = parallel.node_count()
+        parallel.root
+        self.assertEqual(parallel.branches, {})
+        self.assertEqual(parallel.node_count(), nodes)
+
+    def test_encode_and_graft(self):
+        tree = truthtrees.runner(["or(A, B)", "if(A, C)"], "C")
+        copy = truthtrees.TreeNode()
+        truthtrees.graft_subtree(copy, truthtrees.encode_subtree(tree.root))
+        self.assertEqual(truthtrees.encode_subtree(copy), truthtrees.encode_subtree(tree.root))
+        self.assertEqual(copy.is_closed(), tree.root.is_closed())
+        self.assertEqual(len(copy.get_children()), 1)
+
+
+class TestSolverStats(unittest.TestCase):
+    ARGUMENT = (["or(A, B)", "if(A, C)", "if(B, C)"], "C")
+
+    def test_off_by_default(self):
+        self.assertIsNone(truthtrees.runner(*TestSolverStats.ARGUMENT).stats)
+
+    def test_tree_counters(self):
+        tree = truthtrees.runner(*TestSolverStats.ARGUMENT, stats=True)
+        stats = tree.stats
+        self.assertEqual(stats.rules, {"or": 1, "if": 2})
+        self.assertEqual(stats.nodes_created, tree.node_count())
+        self.assertEqual(stats.max_depth, tree.depth())
+        self.assertEqual(stats.max_depth, 3)
+        self.assertEqual(stats.closures, 5)
+        self.assertTrue(stats.closure_checks >= stats.closures)
+        self.assertEqual(sorted(stats.phases), ["expand", "parse", "setup"])
+        self.assertIn("Rule applications: if 2, or 1", stats.report())
+
+    def test_dfs_counters(self):
+        result = truthtrees.runner(*TestSolverStats.ARGUMENT, engine="dfs", stats=True)
+        self.assertEqual(result.stats.nodes_created, result.node_count())
+        self.assertEqual(result.stats.rules, {"or": 1, "if": 3})
+        self.assertIn("search", result.stats.phases)
+
+    def test_rule_names(self):
+        formula = truthtrees.forseti.parser.parse("not(iff(A, B))")
+        self.assertEqual(truthtrees.rule_name(formula), "not iff")
+        self.assertEqual(truthtrees.rule_name(formula.args[0]), "iff")
+
+    def test_lookahead_lookups(self):
+        premises = disjunctions(3)[0] + ["or(A, B)", "not(A)"]
+        original = truthtrees.runner(premises, "B", stats=True)
+        lookahead = truthtrees.runner(premises, "B", "lookahead", stats=True)
+        self.assertTrue(lookahead.stats.index_lookups > lookahead.stats.closure_checks)
+        self.assertEqual(original.stats.index_lookups, original.stats.closure_checks)
+
+
+class TestBudget(unittest.TestCase):
+    PREMISES = disjunctions(8)[0]
+
+    def test_max_nodes(self):
+        tree = truthtrees.runner(TestBudget.PREMISES, "A", max_nodes=100)
+        self.assertIsNone(tree.is_valid())
+        self.assertTrue(tree.undecided)
+        self.assertTrue(tree.node_count() <= 100)
+        self.assertEqual(tree.node_count(), tree.nodes)
+        self.assertTrue(tree.root.can_expand())
+
+    def test_max_depth(self):
+        tree = truthtrees.runner(TestBudget.PREMISES, "A", max_depth=3)
+        self.assertIsNone(tree.is_valid())
+        self.assertEqual(tree.depth(), 3)
+
+    def test_deadline(self):
+        tree = truthtrees.runner(TestBudget.PREMISES, "A", deadline=0)
+        self.assertIsNone(tree.is_valid())
+
+    def test_within_budget(self):
+        unbounded = truthtrees.runner(TestBudget.PREMISES, "A")
+        bounded = truthtrees.runner(TestBudget.PREMISES, "A", max_nodes=unbounded.node_count(),
+                                    max_depth=8, deadline=60)
+        self.assertFalse(bounded.is_valid())
+        self.assertEqual(bounded.node_count(), unbounded.node_count())
+
+    def test_closed_before_budget_ran_out(self):
+        tree = truthtrees.runner(["and(A, not(A))"] + TestBudget.PREMISES, "B", max_nodes=1)
+        self.assertTrue(tree.is_valid())
+
+    def test_dfs(self):
+        self.assertIsNone(truthtrees.runner(TestBudget.PREMISES, "A", engine="dfs", max_depth=3).is_valid())
+        self.assertFalse(truthtrees.runner(TestBudget.PREMISES, "A", engine="dfs", max_depth=8).is_valid())
+
+
+class TestRegularity(unittest.TestCase):
+    def test_repeated_disjunction(self):
+        premises = ["or(A, B)", "or(A, B)", "or(B, A)"]
+        tree = truthtrees.runner(premises, "C")
+        regular = truthtrees.runner(premises, "C", regular=True)
+        self.assertEqual(tree.node_count(), 15)
+        self.assertEqual(regular.node_count(), 3)
+        self.assertEqual(regular.nodes_saved, 8)
+        self.assertFalse(regular.is_valid())
+        self.assertEqual(regular.open_leaves, 2)
+
+    def test_duplicate_components_skipped(self):
+        tree = truthtrees.runner(["and(A, B)", "A"], "C", regular=True)
+        self.assertEqual(repr(tree.root.formulas), "[and(A, B), A, not(C), B]")
+        self.assertEqual(tree.nodes_saved, 0)
+
+    def test_same_verdict(self):
+        arguments = [
+            (["if(A, B)", "if(B, C)", "or(A, not(C))"], "C"),
+            (["or(A, B)", "if(A, C)", "if(B, C)", "or(A, B)"], "C"),
+            (["iff(A, B)", "iff(B, A)", "not(and(B, C))"], "not(and(A, C))"),
+        ]
+        for premises, goal in arguments:
+            for engine in ("tree", "dfs"):
+                plain = truthtrees.runner(premises, goal, engine=engine)
+                regular = truthtrees.runner(premises, goal, engine=engine, regular=True)
+                self.assertEqual(plain.is_valid(), regular.is_valid())
+                self.assertTrue(regular.node_count() <= plain.node_count())
+
+    def test_parallel(self):
+        premises = ["or(P0, Q0)", "or(P1, Q1)", "or(P0, Q0)", "or(A, B)"]
+        sequential = truthtrees.runner(premises, "C", regular=True)
+        parallel = truthtrees.runner(premises, "C", workers=2, regular=True)
+        self.assertEqual(sequential.node_count(), parallel.node_count())
+        self.assertEqual(sequential.nodes_saved, parallel.nodes_saved)
+
+
+class TestCompactTree(unittest.TestCase):
+    def test_same_shape(self):
+        tree = truthtrees.runner(["or(A, or(B, C))", "if(A, D)"], "D")
+        compact = truthtrees.CompactTree(tree.root)
+        self.assertEqual(compact.node_count(), tree.node_count())
+        stack = [(tree.root, compact.root)]
+        while len(stack) > 0:
+            node, view = stack.pop()
+            self.assertEqual(repr(view.formulas), repr([formula.formula for formula in node.formulas]))
+            for formula, formula_view in zip(node.formulas, view.formulas):
+                self.assertEqual((formula_view.key, formula_view.broken, formula_view.number),
+                                 (formula.key, formula.broken, formula.number))
+            self.assertEqual(view.closed, node.closed)
+            self.assertEqual(view.number, node.number)
+            self.assertEqual(view.is_closed(), node.is_closed())
+            self.assertEqual(len(view.children), len(node.children))
+            for child, child_view in zip(node.children, view.children):
+                self.assertEqual(child_view.parent.position, view.position)
+                stack.append((child, child_view))
+        self.assertIsNone(compact.root.parent)
+
+    def test_deep_tree(self):
+        premises, goal = implication_chain(TestDeepTrees.DEPTH)
+        compact = truthtrees.CompactTree(truthtrees.runner(premises, goal).root)
+        self.assertEqual(len(compact), 2 * TestDeepTrees.DEPTH + 1)
+        self.assertTrue(compact.root.is_closed())
+
+    def test_slots(self):
+        node = truthtrees.TreeNode()
+        self.assertRaises(AttributeError, setattr, node, "extra", 1)
+        self.assertRaises(AttributeError, setattr, truthtrees.TreeFormula(truthtrees.Symbol("A")), "extra", 1)
+
+
+class TestBatch(unittest.TestCase):
+    LINES = [
+        '{"id": "mp", "premises": ["if(A, B)", "A"], "goal": "B"}\n',
+        '\n',
+        '{"premises": "or(A, B)", "goal": "A"}\n',
+        '{"premises": ["and(A"], "goal": "B"}\n',
+    ]
+
+    def check_output(self, output):
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]["id"], "mp")
+        self.assertTrue(results[0]["valid"])
+        self.assertEqual(results[0]["nodes"], 3)
+        self.assertFalse(results[1]["valid"])
+        self.assertTrue(results[2]["error"].startswith("SyntaxError"))
+        for result in results:
+            self.assertTrue(result["time"] >= 0)
+
+    def test_run_batch(self):
+        output = io.StringIO()
+        truthtrees.run_batch(TestBatch.LINES, output)
+        self.check_output(output)
+
+    def test_run_batch_workers(self):
+        output = io.StringIO()
+        truthtrees.run_batch(TestBatch.LINES, output, "alpha", "dfs", workers=2)
+        self.check_output(output)
+
+    def test_run_batch_workers_streams(self):
+        output = io.StringIO()
+        written = []
+
+        def lines():
+            for i in range(20):
+                written.append(len(output.getvalue().splitlines()))
+                yield TestBatch.LINES[0]
+        truthtrees.run_batch(lines(), output, workers=2)
+        self.assertEqual(len(output.getvalue().splitlines()), 20)
+        # no more than two records per worker are read ahead of the results written
+        self.assertEqual(written[-1], 20 - 4)
+
+    def test_run_batch_regular_stats(self):
+        output = io.StringIO()
+        truthtrees.run_batch(TestBatch.LINES, output, regular=True, stats=True)
+        self.check_output(output)
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(results[0]["nodes_saved"], 0)
+        self.assertEqual(results[0]["stats"]["rules"], {"if": 1})
+        self.assertNotIn("stats", results[2])
+
+    def test_batch_command_line(self):
+        script = os.path.abspath(truthtrees.__file__)
+        process = subprocess.run([sys.executable, script, "--batch", "-", "--regular", "--stats"],
+                                 input="".join(TestBatch.LINES).encode("utf-8"), stdout=subprocess.PIPE,
+                                 cwd=os.path.dirname(script), check=True)
+        results = [json.loads(line) for line in process.stdout.decode("utf-8").splitlines()]
+        self.assertIn("nodes_saved", results[0])
+        self.assertIn("stats", results[1])
+
+
+class TestCommandLine(unittest.TestCase):
+    def run_cli(self, *args):
+        script = os.path.abspath(truthtrees.__file__)
+        return subprocess.check_output([sys.executable, script] + list(args), cwd=os.path.dirname(script),
+                                       stderr=subprocess.STDOUT).decode("utf-8")
+
+    def test_regular(self):
+        output = self.run_cli("--regular", "A", "A")
+        self.assertIn("Argument is valid", output)
+        self.assertIn("Nodes saved by regularity: ", output)
+
+    def test_regular_other_engines(self):
+        engines = ["sat", "auto"] + (["table"] if truthtrees.table.numpy is not None else [])
+        for engine in engines:
+            output = self.run_cli("--engine", engine, "--regular", "A", "A")
+            self.assertIn("Argument is valid", output)
+
+
+class TestDeepTrees(unittest.TestCase):
+    DEPTH = 2000
+
+    def test_deep_tree(self):
+        premises, goal = implication_chain(TestDeepTrees.DEPTH)
+        tree = truthtrees.runner(premises, goal)
+        self.assertTrue(tree.is_valid())
+        self.assertTrue(tree.is_done())
+        self.assertFalse(tree.root.can_expand())
+        self.assertFalse(tree.expand_node(tree.root))
+        self.assertEqual(tree.root.get_children(), [])
+        self.assertEqual(tree.node_count(), 2 * TestDeepTrees.DEPTH + 1)
+
+    def test_deep_tree_open_leaf(self):
+        premises, goal = implication_chain(TestDeepTrees.DEPTH)
+        tree = truthtrees.runner(premises, "B")
+        self.assertFalse(tree.is_valid())
+        self.assertEqual(len(tree.root.get_children()), 1)
+        left, right = tree.root.add_children()
+        self.assertEqual(len(left), 1)
+        self.assertFalse(tree.root.can_expand())
+
+    def test_deep_check_validity(self):
+        premises, goal = implication_chain(TestDeepTrees.DEPTH)
+        self.assertTrue(truthtrees.runner(premises, goal, engine="dfs").is_valid())
+
+
+if __name__ == "__main__":
+    unittest.main()
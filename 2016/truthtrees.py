@@ -1,10 +1,20 @@
 # -*- coding: utf-8 -*-
 
 from __future__ import print_function, unicode_literals
+from array import array
 import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+import json
+import sys
+from timeit import default_timer
 from forseti.formula import Formula, Predicate, Symbol, Not, And, Or, If, Iff
 import forseti.parser
 from six import string_types
+import sat
+import table
 
 
 def pretty_print(formula):
@@ -35,88 +45,652 @@ def pretty_print(formula):
     return text.strip()
 
 
-class TreeNode(object):
+class BranchIndex(object):
+    """
+    Persistent hash trie of the keys of the compound formulas on a branch, literals being kept in bitsets.
+    Adding a key returns a new index that shares every untouched trie node with the old one, so a child node
+    starts from its parent's index without copying it and a lookup costs the same no matter how deep or wide
+    the tree is.
+    """
+    __slots__ = ("root", "size")
+    BITS = 5
+    MASK = (1 << BITS) - 1
+    HASH_BITS = 64
+
+    def __init__(self, root=None, size=0):
+        self.root = root if root is not None else (0, ())
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, key):
+        key_hash = hash(key) & ((1 << BranchIndex.HASH_BITS) - 1)
+        bitmap, entries = self.root
+        shift = 0
+        while True:
+            bit = 1 << ((key_hash >> shift) & BranchIndex.MASK)
+            if not bitmap & bit:
+                return False
+            entry = entries[bin(bitmap & (bit - 1)).count("1")]
+            if isinstance(entry, tuple):
+                bitmap, entries = entry
+                shift += BranchIndex.BITS
+            elif isinstance(entry, frozenset):
+                return key in entry
+            else:
+                return entry == key
+
+    def add(self, key):
+        """
+
+        :param key:
+        :type key: string_types
+        :return: index holding every key of this one plus key
+        :rtype: BranchIndex
+        """
+        key_hash = hash(key) & ((1 << BranchIndex.HASH_BITS) - 1)
+        root = BranchIndex._insert(self.root, key, key_hash, 0)
+        if root is self.root:
+            return self
+        return BranchIndex(root, self.size + 1)
+
+    @staticmethod
+    def _insert(trie, key, key_hash, shift):
+        bitmap, entries = trie
+        bit = 1 << ((key_hash >> shift) & BranchIndex.MASK)
+        position = bin(bitmap & (bit - 1)).count("1")
+        if not bitmap & bit:
+            return bitmap | bit, entries[:position] + (key,) + entries[position:]
+
+        entry = entries[position]
+        if isinstance(entry, tuple):
+            new_entry = BranchIndex._insert(entry, key, key_hash, shift + BranchIndex.BITS)
+        elif isinstance(entry, frozenset):
+            new_entry = entry if key in entry else entry | frozenset([key])
+        elif entry == key:
+            new_entry = entry
+        elif shift + BranchIndex.BITS >= BranchIndex.HASH_BITS:
+            new_entry = frozenset([entry, key])
+        else:
+            # push the stored key one level down and retry there
+            entry_hash = hash(entry) & ((1 << BranchIndex.HASH_BITS) - 1)
+            entry_bit = 1 << ((entry_hash >> (shift + BranchIndex.BITS)) & BranchIndex.MASK)
+            new_entry = BranchIndex._insert((entry_bit, (entry,)), key, key_hash, shift + BranchIndex.BITS)
+
+        if new_entry is entry:
+            return trie
+        return bitmap, entries[:position] + (new_entry,) + entries[position + 1:]
+
+
+def flatten(formula, connective):
+    """
+    Collect the operands of a chain of the same binary connective, so and(A, and(B, C)) gives A, B and C
+
+    :param formula:
+    :type formula: Formula
+    :param connective: And or Or
+    :type connective: type
+    :return: the operands, left to right
+    :rtype: List[Formula]
+    """
+    operands = []
+    stack = [formula]
+    while len(stack) > 0:
+        current = stack.pop()
+        if isinstance(current, connective):
+            stack.extend(reversed(current.args))
+        else:
+            operands.append(current)
+    return operands
+
+
+def decompose(formula):
+    """
+    Apply the tree rule for the main connective of formula. Nested conjunctions and disjunctions (and their
+    negations) are handled as a single n-ary connective, so the whole chain is broken in one rule application.
+
+    :param formula:
+    :type formula: Formula
+    :return: One list of formulas per branch the rule produces. Non-branching (alpha) rules give a single
+             branch, branching (beta) rules give two or more. Literals give no branches.
+    :rtype: List[List[Formula]]
+    """
+    if isinstance(formula, Not):
+        inner = formula.args[0]
+        if isinstance(inner, Not):
+            return [[inner.args[0]]]
+        elif isinstance(inner, And):
+            return [[Not(operand)] for operand in flatten(inner, And)]
+        elif isinstance(inner, Or):
+            return [[Not(operand) for operand in flatten(inner, Or)]]
+        elif isinstance(inner, If):
+            return [[inner.args[0], Not(inner.args[1])]]
+        elif isinstance(inner, Iff):
+            return [[inner.args[0], Not(inner.args[1])], [Not(inner.args[0]), inner.args[1]]]
+    elif isinstance(formula, And):
+        return [flatten(formula, And)]
+    elif isinstance(formula, Or):
+        return [[operand] for operand in flatten(formula, Or)]
+    elif isinstance(formula, If):
+        return [[Not(formula.args[0])], [formula.args[1]]]
+    elif isinstance(formula, Iff):
+        return [[formula.args[0], formula.args[1]], [Not(formula.args[0]), Not(formula.args[1])]]
+    return []
+
+
+def negate(formula):
+    """
+    Return the formula that closes a branch containing formula
+
+    :param formula:
+    :type formula: Formula
+    :return:
+    :rtype: Formula
+    """
+    return formula.args[0] if isinstance(formula, Not) else Not(formula)
+
+
+def is_branching(formula):
+    """
+    Check if breaking formula splits the branch (a beta rule) rather than extending it (an alpha rule)
+
+    :param formula:
+    :type formula: Formula
+    :return:
+    """
+    if isinstance(formula, Not):
+        return isinstance(formula.args[0], And) or isinstance(formula.args[0], Iff)
+    return isinstance(formula, Or) or isinstance(formula, If) or isinstance(formula, Iff)
+
+
+class Strategy(object):
+    """
+    Decides which unbroken formula of a node gets broken next. Subclasses only change the shape and size
+    of the tree, never whether the argument is found valid.
+    """
+    name = ""
+
+    def select(self, tree, node, formulas):
+        """
+
+        :param tree: tree being expanded, None when deciding validity with check_validity
+        :type tree: TruthTree
+        :param node: node the formulas are on
+        :type node: TreeNode
+        :param formulas: the unbroken formulas of node, in the order they were added (never empty)
+        :type formulas: Iterator[TreeFormula]
+        :return: the formula to break next
+        :rtype: TreeFormula
+        """
+        raise NotImplementedError("Not implemented")
+
+
+class OriginalOrder(Strategy):
+    """
+    Break formulas in the order they were added to the node
+    """
+    name = "original"
+
+    def select(self, tree, node, formulas):
+        return next(formulas)
+
+
+class AlphaFirst(Strategy):
+    """
+    Break non-branching formulas before branching ones, so that they are not copied into every new branch
+    and can close a branch before it splits
+    """
+    name = "alpha"
+
+    def select(self, tree, node, formulas):
+        first = None
+        for formula in formulas:
+            if not is_branching(formula.formula):
+                return formula
+            if first is None:
+                first = formula
+        return first
+
+
+class Lookahead(Strategy):
+    """
+    Break non-branching formulas first. Among branching formulas, pick the one whose new branches would
+    close straight away on the most open branches below the node, falling back to the original order when
+    none of them would close anything.
+    """
+    name = "lookahead"
+
+    def select(self, tree, node, formulas):
+        leaves = None
+        best = None
+        best_score = 0
+        for formula in formulas:
+            if not is_branching(formula.formula):
+                return formula
+            if leaves is None:
+                leaves = node.get_children()
+            score = 0
+            branches = decompose(formula.formula)
+            stats = tree.stats if tree is not None else None
+            for leaf in leaves:
+                score += Lookahead.closing_branches(leaf, branches, stats)
+            if best is None or score > best_score:
+                best = formula
+                best_score = score
+        return best
+
+    @staticmethod
+    def closing_branches(leaf, branches, stats=None):
+        """
+        Count the branches that would close as soon as they were added below leaf
+
+        :param leaf:
+        :type leaf: TreeNode
+        :param branches: output of decompose
+        :type branches: List[List[Formula]]
+        :param stats: counts the index lookups made, if given
+        :type stats: SolverStats
+        :return:
+        :rtype: int
+        """
+        closing = 0
+        for components in branches:
+            added = set()
+            for component in components:
+                check = negate(component)
+                if stats is not None:
+                    stats.index_lookups += 1
+                if leaf.has_formula(check) or repr(check) in added:
+                    closing += 1
+                    break
+                added.add(repr(component))
+        return closing
+
+
+STRATEGIES = {
+    OriginalOrder.name: OriginalOrder,
+    AlphaFirst.name: AlphaFirst,
+    Lookahead.name: Lookahead,
+}
+
+
+def get_strategy(strategy):
+    """
+
+    :param strategy: a strategy name from STRATEGIES, a Strategy or None for the original order
+    :return:
+    :rtype: Strategy
+    """
+    if strategy is None:
+        return OriginalOrder()
+    if isinstance(strategy, Strategy):
+        return strategy
+    if strategy not in STRATEGIES:
+        raise ValueError("Unknown strategy: " + str(strategy))
+    return STRATEGIES[strategy]()
+
+
+class SolverStats(object):
+    """
+    Counters filled in while a tree is built. Solvers only touch them when they were given an instance, so
+    solving without statistics costs one comparison with None per rule application and per closure check.
+    Work done in worker processes is not counted.
+    """
     def __init__(self):
+        self.rules = {}
+        self.closure_checks = 0
+        self.index_lookups = 0
+        self.closures = 0
+        self.nodes_created = 0
+        self.max_depth = 0
+        self.phases = {}
+
+    def count_rule(self, formula):
+        """
+        Record that formula was broken
+
+        :param formula:
+        :type formula: Formula
+        """
+        name = rule_name(formula)
+        self.rules[name] = self.rules.get(name, 0) + 1
+
+    def add_time(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def as_dict(self):
+        return {
+            "rules": dict(self.rules),
+            "closure_checks": self.closure_checks,
+            "index_lookups": self.index_lookups,
+            "closures": self.closures,
+            "nodes_created": self.nodes_created,
+            "max_depth": self.max_depth,
+            "phases": dict(self.phases),
+        }
+
+    def report(self):
+        """
+
+        :return: the counters as human readable lines
+        :rtype: string_types
+        """
+        rules = ", ".join("%s %d" % (name, self.rules[name]) for name in sorted(self.rules))
+        phases = ", ".join("%s %.6fs" % (name, self.phases[name]) for name in sorted(self.phases))
+        lines = [
+            "Rule applications: " + (rules if len(rules) > 0 else "none"),
+            "Closure checks: %d" % self.closure_checks,
+            "Index lookups: %d" % self.index_lookups,
+            "Branches closed: %d" % self.closures,
+            "Nodes created: %d" % self.nodes_created,
+            "Max depth: %d" % self.max_depth,
+            "Time: " + phases,
+        ]
+        return "\n".join(lines)
+
+
+class Budget(object):
+    """
+    Limits on how much work a solve may do. A solve that would go past one of them stops and reports the
+    argument as undecided, keeping what it has built so far.
+    """
+    def __init__(self, max_nodes=None, max_depth=None, deadline=None):
+        """
+
+        :param max_nodes: most nodes the tree may have
+        :type max_nodes: int
+        :param max_depth: longest branch allowed, the root alone having depth 0
+        :type max_depth: int
+        :param deadline: seconds the solve may run for, counted from start()
+        :type deadline: float
+        """
+        self.max_nodes = max_nodes
+        self.max_depth = max_depth
+        self.deadline = deadline
+        self.end = None
+
+    def start(self):
+        self.end = default_timer() + self.deadline if self.deadline is not None else None
+
+    def expired(self):
+        return self.end is not None and default_timer() > self.end
+
+    def allows(self, nodes, depth):
+        """
+
+        :param nodes: number of nodes the tree would have
+        :type nodes: int
+        :param depth: depth of the deepest node the tree would have
+        :type depth: int
+        :rtype: bool
+        """
+        return ((self.max_nodes is None or nodes <= self.max_nodes) and
+                (self.max_depth is None or depth <= self.max_depth))
+
+
+def rule_name(formula):
+    """
+
+    :param formula:
+    :type formula: Formula
+    :return: name of the tree rule that breaks formula, e.g. "and" or "not if"
+    :rtype: string_types
+    """
+    names = {And: "and", Or: "or", If: "if", Iff: "iff", Not: "not"}
+    if isinstance(formula, Not):
+        return "not " + names.get(type(formula.args[0]), "atom")
+    return names.get(type(formula), "atom")
+
+
+class AtomTable(object):
+    """
+    Numbers the atoms of one solve from 0 so the literals on a branch can be kept as two bitsets, one for the
+    atoms that are true on it and one for those that are false
+    """
+    __slots__ = ("ids", "names")
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def bit(self, atom):
+        """
+
+        :param atom:
+        :type atom: Symbol | Predicate
+        :return: the bit standing for atom, numbering it if it is new
+        :rtype: int
+        """
+        key = repr(atom)
+        atom_id = self.ids.get(key)
+        if atom_id is None:
+            atom_id = len(self.names)
+            self.ids[key] = atom_id
+            self.names.append(key)
+        return 1 << atom_id
+
+    def literal(self, formula):
+        """
+
+        :param formula:
+        :type formula: Formula
+        :return: (bit, True) for an atom, (bit, False) for a negated atom, None for anything else
+        """
+        if isinstance(formula, Not):
+            if isinstance(formula.args[0], (Symbol, Predicate)):
+                return self.bit(formula.args[0]), False
+            return None
+        if isinstance(formula, (Symbol, Predicate)):
+            return self.bit(formula), True
+        return None
+
+    def register(self, formula):
+        """
+        Number every atom in formula, in the order they appear
+
+        :param formula:
+        :type formula: Formula
+        """
+        stack = [formula]
+        while len(stack) > 0:
+            current = stack.pop()
+            if isinstance(current, (Symbol, Predicate)):
+                self.bit(current)
+            elif isinstance(current, (Not, And, Or, If, Iff)):
+                stack.extend(reversed(current.args))
+
+    def model(self, positive):
+        """
+
+        :param positive: bitset of the atoms that are true
+        :type positive: int
+        :return: truth value of every atom, keyed on its name
+        :rtype: dict
+        """
+        return dict((name, bool(positive >> atom_id & 1)) for atom_id, name in enumerate(self.names))
+
+
+class TreeNode(object):
+    __slots__ = ("formulas", "parent", "children", "closed", "number", "all_closed", "index", "depth", "atoms",
+                 "positive", "negative")
+
+    def __init__(self, parent=None, atoms=None):
+        """
+
+        :param parent:
+        :type parent: TreeNode
+        :param atoms: numbering of the atoms for a root node, children share their parent's
+        :type atoms: AtomTable
+        """
         self.formulas = []
-        self.parent = None
+        self.parent = parent
         self.children = []
         self.closed = False
         self.number = None
+        self.all_closed = False
+        if parent is not None:
+            self.index = parent.index
+            self.depth = parent.depth + 1
+            self.atoms = parent.atoms
+            self.positive = parent.positive
+            self.negative = parent.negative
+        else:
+            self.index = BranchIndex()
+            self.depth = 0
+            self.atoms = atoms if atoms is not None else AtomTable()
+            self.positive = 0
+            self.negative = 0
+
+    def fork(self):
+        """
+        Node outside the tree that starts from the branch ending at this node, without any formulas of its own
+
+        :rtype: TreeNode
+        """
+        node = TreeNode(atoms=self.atoms)
+        node.index = self.index
+        node.depth = self.depth
+        node.positive = self.positive
+        node.negative = self.negative
+        return node
+
+    def append_formula(self, formula):
+        """
+        Put formula on this node without checking it for closure. Literals go into the bitsets of the branch,
+        everything else into its index.
+
+        :param formula:
+        :type formula: TreeFormula
+        :return: see AtomTable.literal
+        """
+        self.formulas.append(formula)
+        literal = self.atoms.literal(formula.formula)
+        if literal is None:
+            self.index = self.index.add(formula.key)
+        elif literal[1]:
+            self.positive |= literal[0]
+        else:
+            self.negative |= literal[0]
+        return literal
 
     def add_formula(self, formula, count):
         if self.closed:
             return False
-        self.formulas.append(formula)
-        to_check = Not(formula.formula) if not isinstance(formula.formula, Not) else formula.formula.args[0]
-        if self.has_formula(to_check):
+        literal = self.append_formula(formula)
+        if literal is None:
+            closes = self.has_formula(negate(formula.formula))
+        else:
+            closes = (self.negative if literal[1] else self.positive) & literal[0]
+        if closes:
             self.closed = True
             self.number = count
+            self.close_branch()
             return True
         return False
 
-    def has_formula(self, check_formula):
+    def close_if_contradictory(self, count):
+        """
+        Close this node if it holds a formula and its negation. Formulas put on with append_formula are not
+        checked as they go on, so this is done once the root has all of them.
+
+        :param count: line number to record the closure under
+        :type count: int
+        :return: True if the node closed
+        """
         for formula in self.formulas:
-            if formula.formula == check_formula:
+            if self.has_formula(negate(formula.formula)):
+                self.closed = True
+                self.number = count
+                self.close_branch()
                 return True
-        if self.parent is not None:
-            return self.parent.has_formula(check_formula)
         return False
 
+    def close_branch(self):
+        """
+        Record that this leaf closed, marking every ancestor whose children are now all closed
+
+        """
+        node = self
+        node.all_closed = True
+        while node.parent is not None:
+            node = node.parent
+            for child in node.children:
+                if not child.all_closed:
+                    return
+            node.all_closed = True
+
+    def has_formula(self, check_formula):
+        """
+        Check whether check_formula is on the branch ending at this node
+
+        :param check_formula:
+        :type check_formula: Formula
+        :return:
+        """
+        literal = self.atoms.literal(check_formula)
+        if literal is None:
+            return repr(check_formula) in self.index
+        return ((self.positive if literal[1] else self.negative) & literal[0]) != 0
+
     def is_closed(self):
-        if len(self.children) == 0:
-            return self.closed
-        closed_children = []
-        for child in self.children:
-            closed_children.append(child.is_closed())
-        return not (False in closed_children)
+        return self.all_closed
 
     def can_expand(self):
-        if self.closed:
-            return False
-        for formula in self.formulas:
-            if formula.broken is False:
-                return True
-        expand = []
-        for child in self.children:
-            expand.append(child.can_expand())
-        return True in expand
+        stack = [self]
+        while len(stack) > 0:
+            node = stack.pop()
+            if node.is_closed():
+                continue
+            for formula in node.formulas:
+                if formula.broken is False:
+                    return True
+            stack.extend(node.children)
+        return False
 
-    def add_children(self):
+    def add_children(self, count=2, leaves=None):
         """
+        Split every open leaf below this node into count new leaves
 
-        :return: Two lists one containing all new left nodes in the tree and one containing all new right nodes
-        :rtype: List[TreeNode], List[TreeNode]
+        :param count:
+        :type count: int
+        :param leaves: the open leaves below this node if already known
+        :type leaves: List[TreeNode]
+        :return: count lists, the first containing all new leftmost nodes in the tree, the second all new
+                 nodes right of those and so on
+        :rtype: List[List[TreeNode]]
         """
-        if self.closed:
-            return [[], []]
-        elif len(self.children) == 0:
-            for i in range(2):
-                node = TreeNode()
-                node.parent = self
-                self.children.append(node)
-            return [self.children[0]], [self.children[1]]
-        else:
-            left_nodes = []
-            right_nodes = []
-            for child in self.children:
-                left, right = child.add_children()
-                left_nodes.extend(left)
-                right_nodes.extend(right)
-            return left_nodes, right_nodes
+        new_nodes = [[] for i in range(count)]
+        if leaves is None:
+            leaves = self.get_children()
+        for leaf in leaves:
+            for i in range(count):
+                leaf.children.append(TreeNode(leaf))
+                new_nodes[i].append(leaf.children[i])
+        return new_nodes
 
     def get_children(self):
-        if self.closed:
-            return []
-        elif len(self.children) == 0:
-            return [self]
-        else:
-            children = []
-            for child in self.children:
-                children.extend(child.get_children())
-            return children
+        """
+
+        :return: the open leaves below this node, left to right
+        :rtype: List[TreeNode]
+        """
+        leaves = []
+        stack = [self]
+        while len(stack) > 0:
+            node = stack.pop()
+            if node.is_closed():
+                continue
+            if len(node.children) == 0:
+                leaves.append(node)
+            else:
+                stack.extend(reversed(node.children))
+        return leaves
 
 
 class TreeFormula(object):
+    __slots__ = ("formula", "key", "broken", "number")
+
     def __init__(self, formula):
         """
 
@@ -124,49 +698,437 @@ class TreeFormula(object):
         :type formula: Formula
         """
         self.formula = formula
+        self.key = repr(formula)
         self.broken = not self.can_break()
         self.number = None
 
     def can_break(self):
-        return not (isinstance(self.formula, Symbol) or
-                    (isinstance(self.formula, Not) and isinstance(self.formula.args[0], Symbol)))
+        # the same formulas AtomTable.literal takes as literals
+        return not (isinstance(self.formula, (Symbol, Predicate)) or
+                    (isinstance(self.formula, Not) and isinstance(self.formula.args[0], (Symbol, Predicate))))
+
+    def __repr__(self):
+        return repr(self.formula)
+
+
+class CompactTree(object):
+    """
+    Read-only copy of a finished tree held in parallel arrays instead of one object per node and formula.
+    Nodes are numbered in preorder; formulas of node i are formulas[formula_start[i]:formula_start[i + 1]].
+    The tree it is made from has to be built first. Copying with release lets that tree go as it is copied,
+    so holding the copy instead of the tree does not cost more memory at any point.
+    """
+    __slots__ = ("parent", "first_child", "next_sibling", "formula_start", "formulas", "formula_numbers",
+                 "formula_broken", "closed", "all_closed", "numbers")
+
+    def __init__(self, root, release=False):
+        """
+
+        :param root:
+        :type root: TreeNode
+        :param release: detach the children of every node once it is copied, leaving root without children.
+                        Nodes already copied are then freed during the copy unless something else holds them.
+        :type release: bool
+        """
+        self.parent = array("i")
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        self.formula_start = array("i")
+        self.formulas = []
+        self.formula_numbers = array("i")
+        self.formula_broken = bytearray()
+        self.closed = bytearray()
+        self.all_closed = bytearray()
+        self.numbers = array("i")
+
+        last_child = []
+        stack = [(root, -1)]
+        while len(stack) > 0:
+            node, parent = stack.pop()
+            position = len(self.parent)
+            self.parent.append(parent)
+            self.first_child.append(-1)
+            self.next_sibling.append(-1)
+            last_child.append(-1)
+            if parent >= 0:
+                if last_child[parent] < 0:
+                    self.first_child[parent] = position
+                else:
+                    self.next_sibling[last_child[parent]] = position
+                last_child[parent] = position
+            self.formula_start.append(len(self.formulas))
+            for formula in node.formulas:
+                self.formulas.append(formula.formula)
+                self.formula_numbers.append(formula.number if formula.number is not None else -1)
+                self.formula_broken.append(formula.broken)
+            self.closed.append(node.closed)
+            self.all_closed.append(node.all_closed)
+            self.numbers.append(node.number if node.number is not None else -1)
+            for child in reversed(node.children):
+                stack.append((child, position))
+            if release:
+                node.children = []
+        self.formula_start.append(len(self.formulas))
+
+    def __len__(self):
+        return len(self.parent)
+
+    def node_count(self):
+        return len(self.parent)
+
+    @property
+    def root(self):
+        return CompactNode(self, 0)
+
+    def node(self, position):
+        """
+
+        :param position: preorder number of the node
+        :type position: int
+        :rtype: CompactNode
+        """
+        return CompactNode(self, position)
+
+
+class CompactNode(object):
+    """
+    View of one node of a CompactTree with the read side of the TreeNode interface
+    """
+    __slots__ = ("tree", "position")
+
+    def __init__(self, tree, position):
+        self.tree = tree
+        self.position = position
+
+    @property
+    def formulas(self):
+        """
+
+        :return: the formulas on this node, in order
+        :rtype: List[CompactFormula]
+        """
+        return [CompactFormula(self.tree, position) for position in
+                range(self.tree.formula_start[self.position], self.tree.formula_start[self.position + 1])]
+
+    @property
+    def parent(self):
+        parent = self.tree.parent[self.position]
+        return CompactNode(self.tree, parent) if parent >= 0 else None
+
+    @property
+    def children(self):
+        children = []
+        child = self.tree.first_child[self.position]
+        while child >= 0:
+            children.append(CompactNode(self.tree, child))
+            child = self.tree.next_sibling[child]
+        return children
+
+    @property
+    def closed(self):
+        return bool(self.tree.closed[self.position])
+
+    @property
+    def number(self):
+        number = self.tree.numbers[self.position]
+        return number if number >= 0 else None
+
+    def is_closed(self):
+        return bool(self.tree.all_closed[self.position])
+
+
+class CompactFormula(object):
+    """
+    View of one formula of a CompactTree with the read side of the TreeFormula interface
+    """
+    __slots__ = ("tree", "position")
+
+    def __init__(self, tree, position):
+        self.tree = tree
+        self.position = position
+
+    @property
+    def formula(self):
+        return self.tree.formulas[self.position]
+
+    @property
+    def key(self):
+        return repr(self.formula)
+
+    @property
+    def broken(self):
+        return bool(self.tree.formula_broken[self.position])
+
+    @property
+    def number(self):
+        number = self.tree.formula_numbers[self.position]
+        return number if number >= 0 else None
 
     def __repr__(self):
         return repr(self.formula)
 
 
 class TruthTree(object):
-    def __init__(self, formulas, goal):
-        self.root = TreeNode()
+    def __init__(self, formulas, goal, strategy=None, workers=None, stats=None, budget=None, regular=False,
+                 full_tree=True):
+        """
+
+        :param formulas:
+        :type formulas: List[Formula]
+        :param goal:
+        :type goal: Formula
+        :param strategy: see get_strategy
+        :param workers: number of processes to solve independent subtrees in, None to solve in this process
+        :type workers: int
+        :param stats: counters to fill in while solving, None to not collect any
+        :type stats: SolverStats
+        :param budget: limits after which to stop undecided, None to always finish the tree. Subtrees are not
+                       handed to workers when there is a budget.
+        :type budget: Budget
+        :param regular: never put a formula on a branch that already has it, and do not split a branch that
+                        already has every component of one of the new branches
+        :type regular: bool
+        :param full_tree: with workers, have them send back the subtrees they grow so root can show the whole
+                          tree. Otherwise only their verdicts and counts come back, and root ends at the leaves
+                          that were handed out.
+        :type full_tree: bool
+        """
+        start = default_timer()
+        if budget is not None:
+            budget.start()
+        root = TreeNode()
         for formula in formulas:
-            self.root.formulas.append(TreeFormula(formula))
-        self.root.formulas.append(TreeFormula(Not(goal)))
-        self.count = 1
+            root.atoms.register(formula)
+        root.atoms.register(goal)
+        for formula in formulas:
+            root.append_formula(TreeFormula(formula))
+        root.append_formula(TreeFormula(Not(goal)))
+        count = 2 if root.close_if_contradictory(1) else 1
+        self.setup(root, strategy, workers, count, stats, budget, regular)
+        self.full_tree = full_tree
+        if stats is not None:
+            stats.nodes_created += 1
+            stats.add_time("setup", default_timer() - start)
         self.expand_tree()
 
+    @classmethod
+    def from_root(cls, root, strategy=None, count=1, regular=False):
+        """
+        Wrap an already built root in a tree without expanding it
+
+        :param root:
+        :type root: TreeNode
+        :param strategy: see get_strategy
+        :param count: next line number to hand out
+        :type count: int
+        :param regular: see TruthTree
+        :type regular: bool
+        :return:
+        :rtype: TruthTree
+        """
+        tree = cls.__new__(cls)
+        tree.setup(root, strategy, None, count, regular=regular)
+        return tree
+
+    def setup(self, root, strategy, workers, count=1, stats=None, budget=None, regular=False):
+        self.strategy = get_strategy(strategy)
+        self.stats = stats
+        self.budget = budget
+        self.regular = regular
+        self.nodes_saved = 0
+        self.undecided = False
+        self.workers = workers if budget is None else None
+        self.full_tree = True
+        self.top = root
+        # what the workers reported for each leaf handed to them, see solve_branch
+        self.branches = {}
+        self.count = count
+        self.open_leaves = len(root.get_children())
+        self.nodes = self.node_count()
+
+    @property
+    def root(self):
+        """
+        Root of the tree, with the subtrees workers sent back grafted on the first time it is asked for
+
+        :rtype: TreeNode
+        """
+        for leaf, branch in self.branches.items():
+            if branch[0] is not None:
+                graft_subtree(leaf, branch[0])
+        self.branches = dict((leaf, (None,) + branch[1:]) for leaf, branch in self.branches.items()
+                             if branch[0] is None)
+        return self.top
+
     def is_done(self):
-        return self.root.is_closed() or not self.root.can_expand()
+        return self.top.is_closed() or not self.top.can_expand()
+
+    def is_valid(self):
+        """
+
+        :return: True if every branch closed, False if one stays open, None if the budget ran out first
+        :rtype: bool | None
+        """
+        if self.top.is_closed():
+            return True
+        if self.undecided:
+            return None
+        return False
 
     def expand_tree(self):
-        while not self.is_done():
-            self.expand_node(self.root)
+        """
+        Break every formula in the tree. With workers, the tree is first grown here until it has enough open
+        branches to keep them busy, and those branches are then finished in parallel by expand_parallel.
+        """
+        start = default_timer()
+        done = self.expand_until(None if self.workers is None or self.workers < 2 else 2 * self.workers)
+        if self.stats is not None:
+            self.stats.add_time("expand", default_timer() - start)
+        if not done:
+            start = default_timer()
+            self.expand_parallel()
+            if self.stats is not None:
+                self.stats.add_time("parallel", default_timer() - start)
+        if self.stats is not None:
+            self.stats.max_depth = self.depth()
+
+    def expand_until(self, leaf_limit=None):
+        """
+        Break formulas in the same order repeated calls to expand_node would, until none are left or the tree
+        has leaf_limit open leaves.
+
+        Instead of searching from the root for each rule application, keep a stack of the nodes still to be
+        visited and a cursor into the formulas of the node on top. Formulas before the cursor are broken and
+        nodes are only left once all their formulas are, so the next formula to break is picked from the
+        cursor onwards and a closed branch is dropped from the stack as soon as it is reached.
+
+        :param leaf_limit:
+        :type leaf_limit: int
+        :return: True if every formula was broken or the budget ran out, False if expansion stopped at
+                 leaf_limit
+        """
+        stack = [self.top]
+        cursor = 0
+        while len(stack) > 0:
+            if leaf_limit is not None and self.open_leaves >= leaf_limit:
+                return False
+            node = stack[-1]
+            if not node.is_closed():
+                while cursor < len(node.formulas) and node.formulas[cursor].broken:
+                    cursor += 1
+                if cursor < len(node.formulas):
+                    if self.budget is not None and self.budget.expired():
+                        self.undecided = True
+                        return True
+                    if not self.expand_formula(self.select_formula(node, cursor), node):
+                        return True
+                    continue
+            stack.pop()
+            cursor = 0
+            if not node.is_closed():
+                stack.extend(reversed(node.children))
+        return True
+
+    def expand_parallel(self):
+        """
+        Finish every open branch in a pool of worker processes.
+
+        Branches below different leaves never share a formula they add, so each leaf is sent off as a
+        branch_state and solved on its own by solve_branch. Formulas still unbroken above the leaves are
+        broken once per branch by the workers. Afterwards they are marked broken here, and line numbers
+        handed out by different workers may repeat across branches. What comes back for each leaf is its
+        verdict and counts, kept in self.branches, plus its subtree in encoded form when full_tree is set,
+        which root grafts on only when the tree is looked at.
+        """
+        leaves = []
+        states = []
+        for leaf in self.top.get_children():
+            state = self.branch_state(leaf)
+            if state is not None:
+                leaves.append(leaf)
+                states.append(state)
+
+        if len(states) > 0:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                for leaf, branch in zip(leaves, executor.map(solve_branch, states)):
+                    subtree, count, saved, closed, nodes, depth, open_leaves, countermodel = branch
+                    self.branches[leaf] = branch
+                    self.count = max(self.count, count)
+                    self.nodes_saved += saved
+                    self.nodes += nodes - 1
+                    self.open_leaves += open_leaves - 1
+                    if closed:
+                        leaf.close_branch()
+
+        stack = [self.top]
+        while len(stack) > 0:
+            node = stack.pop()
+            for formula in node.formulas:
+                if not formula.broken:
+                    formula.broken = True
+                    formula.number = self.count
+                    self.count += 1
+            stack.extend(node.children)
+
+    def branch_state(self, leaf):
+        """
+        Compact, picklable description of the branch ending at leaf for solve_branch
+
+        :param leaf: an open leaf
+        :type leaf: TreeNode
+        :return: formulas above the leaf and on the leaf as (formula, broken) pairs, the next line number, the
+                 strategy and whether the tree is regular, or None if nothing on the branch is left to break
+        """
+        path = []
+        node = leaf.parent
+        while node is not None:
+            path.append(node)
+            node = node.parent
+
+        pending = False
+        above = []
+        for node in reversed(path):
+            for formula in node.formulas:
+                above.append((formula.formula, formula.broken))
+                pending = pending or not formula.broken
+        own = []
+        for formula in leaf.formulas:
+            own.append((formula.formula, formula.broken))
+            pending = pending or not formula.broken
+        if not pending:
+            return None
+        return above, own, self.count, self.strategy, self.regular, self.full_tree
 
     def expand_node(self, node):
-        if node.is_closed():
-            return False
+        stack = [node]
+        while len(stack) > 0:
+            node = stack.pop()
+            if node.is_closed():
+                continue
 
-        for formula in node.formulas:
-            assert(isinstance(formula, TreeFormula))
-            if not formula.broken and formula.can_break():
-                self.expand_formula(formula, node)
-                return True
+            for formula in node.formulas:
+                assert(isinstance(formula, TreeFormula))
+                if not formula.broken and formula.can_break():
+                    return self.expand_formula(self.select_formula(node), node)
 
-        for child in node.children:
-            if self.expand_node(child):
-                return True
+            stack.extend(reversed(node.children))
 
         return False
 
+    def select_formula(self, node, start=0):
+        """
+        Ask the strategy which unbroken formula of node to break next
+
+        :param node: node with at least one unbroken formula at or after start
+        :type node: TreeNode
+        :param start: index of the first formula of node that may be unbroken
+        :type start: int
+        :return:
+        :rtype: TreeFormula
+        """
+        formulas = (formula for formula in islice(node.formulas, start, None) if not formula.broken)
+        return self.strategy.select(self, node, formulas)
+
     def add_formula(self, node, formula):
         """
 
@@ -176,89 +1138,403 @@ class TruthTree(object):
         :type formula: Formula
         :return:
         """
+        if self.regular:
+            if self.stats is not None:
+                self.stats.index_lookups += 1
+            if node.has_formula(formula):
+                return False
+        if self.stats is not None:
+            self.stats.closure_checks += 1
+            self.stats.index_lookups += 1
         if node.add_formula(TreeFormula(formula), self.count):
             self.count += 1
+            self.open_leaves -= 1
+            if self.stats is not None:
+                self.stats.closures += 1
             return True
         return False
 
     def expand_formula(self, tree_formula, tree_node):
+        """
+        Break tree_formula on every open branch below tree_node
+
+        :param tree_formula:
+        :type tree_formula: TreeFormula
+        :param tree_node:
+        :type tree_node: TreeNode
+        :return: False, leaving the tree untouched and marking it undecided, if the split would go over budget
+        :rtype: bool
+        """
+        branches = decompose(tree_formula.formula)
+        leaves = tree_node.get_children()
+        if len(branches) > 1 and self.regular:
+            leaves = self.leaves_to_split(leaves, branches)
+        if len(branches) > 1 and self.budget is not None:
+            deepest = max(leaf.depth for leaf in leaves) if len(leaves) > 0 else tree_node.depth
+            if not self.budget.allows(self.nodes + len(leaves) * len(branches), deepest + 1):
+                self.undecided = True
+                return False
+
         tree_formula.number = self.count
         tree_formula.broken = True
         self.count += 1
-        formula = tree_formula.formula
-        if isinstance(formula, Not):
-            if isinstance(formula.args[0], Not):
-                children_nodes = tree_node.get_children()
-                for child_node in children_nodes:
-                    self.add_formula(child_node, formula.args[0].args[0])
-            elif isinstance(formula.args[0], And):
-                left_nodes, right_nodes = tree_node.add_children()
-                for left_node in left_nodes:
-                    self.add_formula(left_node, Not(formula.args[0].args[0]))
-                for right_node in right_nodes:
-                    self.add_formula(right_node, Not(formula.args[0].args[1]))
-            elif isinstance(formula.args[0], Or):
-                children_nodes = tree_node.get_children()
-                for child_node in children_nodes:
-                    for i in range(2):
-                        if self.add_formula(child_node, Not(formula.args[0].args[i])):
-                            break
-            elif isinstance(formula.args[0], If):
-                children_nodes = tree_node.get_children()
-                for child_node in children_nodes:
-                    if self.add_formula(child_node, formula.args[0].args[0]):
-                        continue
-                    self.add_formula(child_node, Not(formula.args[0].args[1]))
-            elif isinstance(formula.args[0], Iff):
-                left_nodes, right_nodes = tree_node.add_children()
-                for left_node in left_nodes:
-                    if self.add_formula(left_node, formula.args[0].args[0]):
-                        continue
-                    self.add_formula(left_node, Not(formula.args[0].args[1]))
-                for right_node in right_nodes:
-                    if self.add_formula(right_node, Not(formula.args[0].args[0])):
-                        continue
-                    self.add_formula(right_node, formula.args[0].args[1])
-        elif isinstance(formula, And):
-            children_nodes = tree_node.get_children()
-            for child_node in children_nodes:
-                for i in range(2):
-                    if self.add_formula(child_node, formula.args[i]):
-                        break
-        elif isinstance(formula, Or):
-            left_nodes, right_nodes = tree_node.add_children()
-            for left_node in left_nodes:
-                self.add_formula(left_node, formula.args[0])
-            for right_node in right_nodes:
-                self.add_formula(right_node, formula.args[1])
-        elif isinstance(formula, If):
-            left_nodes, right_nodes = tree_node.add_children()
-            for left_node in left_nodes:
-                self.add_formula(left_node, Not(formula.args[0]))
-            for right_node in right_nodes:
-                self.add_formula(right_node, formula.args[1])
-        elif isinstance(formula, Iff):
-            left_nodes, right_nodes = tree_node.add_children()
-            for left_node in left_nodes:
-                for i in range(2):
-                    if self.add_formula(left_node, formula.args[i]):
+        if len(branches) == 0:
+            return True
+        if len(branches) == 1:
+            targets = [leaves]
+        else:
+            targets = tree_node.add_children(len(branches), leaves)
+            self.open_leaves += len(leaves) * (len(targets) - 1)
+            self.nodes += len(leaves) * len(targets)
+            if self.stats is not None:
+                self.stats.nodes_created += len(leaves) * len(targets)
+        if self.stats is not None:
+            self.stats.count_rule(tree_formula.formula)
+        for nodes, components in zip(targets, branches):
+            for node in nodes:
+                for component in components:
+                    if self.add_formula(node, component):
                         break
-            for right_node in right_nodes:
-                for i in range(2):
-                    if self.add_formula(right_node, Not(formula.args[i])):
+        return True
+
+    @property
+    def countermodel(self):
+        """
+        Truth values making every premise true and the goal false, read off the leftmost open branch that has
+        nothing left to break. Atoms without a literal on that branch are false.
+
+        :return: truth value of every atom keyed on its name, None if there is no such branch
+        :rtype: dict
+        """
+        for leaf in self.top.get_children():
+            if leaf in self.branches:
+                countermodel = self.branches[leaf][7]
+                if countermodel is not None:
+                    model = self.top.atoms.model(0)
+                    model.update(countermodel)
+                    return model
+                continue
+            node = leaf
+            while node is not None and all(formula.broken for formula in node.formulas):
+                node = node.parent
+            if node is None:
+                return self.top.atoms.model(leaf.positive)
+        return None
+
+    def leaves_to_split(self, leaves, branches):
+        """
+        Drop the leaves whose branch already has every component of one of branches, counting the nodes not
+        created for them as saved
+
+        :param leaves:
+        :type leaves: List[TreeNode]
+        :param branches: output of decompose
+        :type branches: List[List[Formula]]
+        :return:
+        :rtype: List[TreeNode]
+        """
+        splitting = []
+        for leaf in leaves:
+            present = False
+            for components in branches:
+                present = True
+                for component in components:
+                    if self.stats is not None:
+                        self.stats.index_lookups += 1
+                    if not leaf.has_formula(component):
+                        present = False
                         break
+                if present:
+                    break
+            if present:
+                self.nodes_saved += len(branches)
+            else:
+                splitting.append(leaf)
+        return splitting
+
+    def node_count(self):
+        """
+        Count the nodes in the tree
+
+        :return:
+        :rtype: int
+        """
+        count = 0
+        stack = [self.top]
+        while len(stack) > 0:
+            node = stack.pop()
+            count += 1
+            stack.extend(node.children)
+        # nodes below the leaves handed to workers, the leaves themselves being counted above
+        for branch in self.branches.values():
+            count += branch[4] - 1
+        return count
+
+    def depth(self):
+        """
+        Length of the longest branch, the root alone having depth 0
+
+        :return:
+        :rtype: int
+        """
+        deepest = 0
+        stack = [(self.top, 0)]
+        while len(stack) > 0:
+            node, depth = stack.pop()
+            if node in self.branches:
+                depth += self.branches[node][5]
+            deepest = max(deepest, depth)
+            for child in node.children:
+                stack.append((child, depth + 1))
+        return deepest
+
+
+def solve_branch(state):
+    """
+    Worker for TruthTree.expand_parallel. Rebuild the branch from its branch_state and expand it: everything
+    above the leaf goes on a single node so its pending formulas are broken first, in their original order.
+
+    :param state: output of TruthTree.branch_state
+    :return: the subtree grown below the leaf as encoded by encode_subtree (None unless full_tree was set),
+             the next line number, the nodes regularity saved, whether every branch closed, the number of
+             nodes in the subtree, its depth below the leaf, its open leaves and the countermodel it gives
+    :rtype: tuple
+    """
+    above, own, count, strategy, regular, full_tree = state
+    top = TreeNode()
+    for formula, broken in above:
+        top.append_formula(TreeFormula(formula))
+        top.formulas[-1].broken = broken
+    leaf = TreeNode(top)
+    top.children.append(leaf)
+    for formula, broken in own:
+        leaf.append_formula(TreeFormula(formula))
+        leaf.formulas[-1].broken = broken
+
+    tree = TruthTree.from_root(top, strategy, count, regular)
+    tree.expand_until()
+    closed = leaf.is_closed()
+    subtree = encode_subtree(leaf) if full_tree else None
+    return (subtree, tree.count, tree.nodes_saved, closed, tree.nodes - 1, tree.depth() - 1, tree.open_leaves,
+            None if closed else tree.countermodel)
+
+
+def encode_subtree(node):
+    """
+    Flatten node and everything below it, in preorder, into picklable tuples
+
+    :param node:
+    :type node: TreeNode
+    :return: one (parent position, [(formula, broken, number)], closed, number) tuple per node, the parent
+             position of node itself being None
+    :rtype: List[tuple]
+    """
+    encoded = []
+    stack = [(node, None)]
+    while len(stack) > 0:
+        current, parent = stack.pop()
+        formulas = [(formula.formula, formula.broken, formula.number) for formula in current.formulas]
+        encoded.append((parent, formulas, current.closed, current.number))
+        position = len(encoded) - 1
+        for child in reversed(current.children):
+            stack.append((child, position))
+    return encoded
+
+
+def graft_subtree(leaf, encoded):
+    """
+    Replace leaf with the subtree encode_subtree produced for it
+
+    :param leaf:
+    :type leaf: TreeNode
+    :param encoded:
+    :type encoded: List[tuple]
+    """
+    nodes = []
+    for parent, formulas, closed, number in encoded:
+        if parent is None:
+            node = leaf
+            node.formulas = []
+            if leaf.parent is not None:
+                node.index = leaf.parent.index
+                node.positive = leaf.parent.positive
+                node.negative = leaf.parent.negative
+            else:
+                node.index = BranchIndex()
+                node.positive = 0
+                node.negative = 0
+        else:
+            node = TreeNode(nodes[parent])
+            nodes[parent].children.append(node)
+        for formula, broken, formula_number in formulas:
+            tree_formula = TreeFormula(formula)
+            tree_formula.broken = broken
+            tree_formula.number = formula_number
+            node.append_formula(tree_formula)
+        node.closed = closed
+        node.number = number
+        nodes.append(node)
 
+    for node in nodes:
+        if node.closed:
+            node.close_branch()
 
-def runner(formulas, goal):
+
+class ValidityResult(object):
+    """
+    Verdict of a solve that did not keep the tree around
     """
+    def __init__(self, valid, nodes, stats=None, nodes_saved=0, countermodel=None):
+        self.valid = valid
+        self.nodes = nodes
+        self.stats = stats
+        self.nodes_saved = nodes_saved
+        self.countermodel = countermodel
+
+    def is_valid(self):
+        """
+
+        :return: True or False, or None if the budget ran out before a verdict was reached
+        :rtype: bool | None
+        """
+        return self.valid
+
+    def node_count(self):
+        """
+
+        :return: number of nodes visited before the verdict was reached
+        :rtype: int
+        """
+        return self.nodes
+
+
+def check_validity(formulas, goal, strategy=None, stats=None, budget=None, regular=False):
+    """
+    Decide validity by exploring the tree one branch at a time, depth first.
+
+    Stops at the first branch that is fully broken and still open (invalid) or once every branch has closed
+    (valid). A branch is a single TreeNode whose formulas are only the ones still to be broken and whose
+    index is shared with the branch it split from. Finished branches are dropped, so memory grows with the
+    depth of the tree rather than its size.
 
     :param formulas:
-    :type formulas: List[string_types]
+    :type formulas: List[Formula]
     :param goal:
-    :type goal: string_types
+    :type goal: Formula
+    :param strategy: see get_strategy
+    :param stats: counters to fill in while searching, None to not collect any
+    :type stats: SolverStats
+    :param budget: limits on the nodes visited, the depth reached and the time spent, None for no limits
+    :type budget: Budget
+    :param regular: see TruthTree
+    :type regular: bool
     :return:
+    :rtype: ValidityResult
+    """
+    start = default_timer()
+    if budget is not None:
+        budget.start()
+    strategy = get_strategy(strategy)
+    root = TreeNode()
+    for formula in formulas:
+        root.atoms.register(formula)
+    root.atoms.register(goal)
+    for formula in formulas:
+        root.append_formula(TreeFormula(formula))
+    root.append_formula(TreeFormula(Not(goal)))
+    root.close_if_contradictory(None)
+    root.formulas = [formula for formula in root.formulas if not formula.broken]
+
+    nodes = 1
+    nodes_saved = 0
+    valid = True
+    countermodel = None
+    stack = [(root, 0)]
+    while len(stack) > 0 and valid is True:
+        node, depth = stack.pop()
+        if stats is not None:
+            stats.max_depth = max(stats.max_depth, depth)
+        while not node.closed:
+            if len(node.formulas) == 0:
+                valid = False
+                countermodel = root.atoms.model(node.positive)
+                break
+
+            formula = strategy.select(None, node, iter(node.formulas))
+            branches = decompose(formula.formula)
+            if budget is not None and (budget.expired() or
+                                       (len(branches) > 1 and not budget.allows(nodes + len(branches), depth + 1))):
+                valid = None
+                break
+            node.formulas.remove(formula)
+            if stats is not None:
+                stats.count_rule(formula.formula)
+            if len(branches) == 1:
+                extend_branch(node, branches[0], stats, regular)
+                continue
+            if regular and any(all(node.has_formula(component) for component in components)
+                               for components in branches):
+                nodes_saved += len(branches)
+                continue
+
+            children = []
+            for components in branches:
+                child = node.fork()
+                child.formulas = list(node.formulas)
+                extend_branch(child, components, stats, regular)
+                children.append((child, depth + 1))
+            nodes += len(children)
+            stack.extend(reversed(children))
+            break
+
+    if stats is not None:
+        stats.nodes_created += nodes
+        stats.add_time("search", default_timer() - start)
+    return ValidityResult(valid, nodes, stats, nodes_saved, countermodel)
+
+
+def extend_branch(node, components, stats=None, regular=False):
+    """
+    Helper for check_validity. Add components to the branch node stands for, keeping only the formulas
+    that still need breaking in node.formulas
+
+    :param node:
+    :type node: TreeNode
+    :param components:
+    :type components: List[Formula]
+    :param stats: see check_validity
+    :type stats: SolverStats
+    :param regular: skip components already on the branch
+    :type regular: bool
+    """
+    for component in components:
+        if regular and node.has_formula(component):
+            continue
+        tree_formula = TreeFormula(component)
+        if stats is not None:
+            stats.closure_checks += 1
+            stats.index_lookups += 1
+        if node.add_formula(tree_formula, None):
+            if stats is not None:
+                stats.closures += 1
+            return
+        if tree_formula.broken:
+            node.formulas.pop()
+
+
+ENGINES = ("tree", "dfs", "sat", "table", "auto")
+
+
+def parse_argument(formulas, goal):
     """
 
+    :param formulas: blank formulas are skipped
+    :type formulas: List[string_types]
+    :param goal:
+    :type goal: string_types
+    :return: the parsed formulas and goal
+    :rtype: List[Formula], Formula
+    """
     if isinstance(formulas, string_types):
         formulas = [formulas]
 
@@ -272,17 +1548,215 @@ def runner(formulas, goal):
             continue
         parsed_formulas.append(forseti.parser.parse(formula))
 
-    goal = forseti.parser.parse(goal)
-    return TruthTree(parsed_formulas, goal)
+    return parsed_formulas, forseti.parser.parse(goal)
+
+
+def argument_key(formulas, goal):
+    """
+    Key for a parsed argument that does not depend on how its formulas were spaced or capitalised. The order
+    of the premises is kept, since it decides the order the tree lists and breaks them in.
+
+    :param formulas:
+    :type formulas: List[Formula]
+    :param goal:
+    :type goal: Formula
+    :return:
+    :rtype: tuple
+    """
+    return tuple(repr(formula) for formula in formulas), repr(goal)
+
+
+def runner(formulas, goal, strategy=None, engine="tree", workers=None, stats=False, max_nodes=None, max_depth=None,
+           deadline=None, regular=False, full_tree=True):
+    """
+
+    :param formulas:
+    :type formulas: List[string_types]
+    :param goal:
+    :type goal: string_types
+    :param strategy: see get_strategy
+    :param engine: "tree" builds the whole TruthTree, "dfs" only decides validity with check_validity and
+                   "sat" decides it with the clause solver in sat, also finding a countermodel. "table" evaluates
+                   the whole truth table at once with numpy, and "auto" does so when numpy is installed and the
+                   argument has at most table.MAX_ATOMS atoms, building the tree otherwise.
+    :param workers: processes to build the tree with, see TruthTree
+    :param stats: collect a SolverStats, available as the stats attribute of the result
+    :type stats: bool
+    :param max_nodes: stop undecided rather than grow the tree past this many nodes
+    :type max_nodes: int
+    :param max_depth: stop undecided rather than grow a branch deeper than this
+    :type max_depth: int
+    :param deadline: stop undecided after this many seconds
+    :type deadline: float
+    :param regular: skip formulas already on the branch, see TruthTree. The sat engine ignores it.
+    :type regular: bool
+    :param full_tree: have workers send back the branches they build, see TruthTree
+    :type full_tree: bool
+    :return:
+    :rtype: TruthTree | ValidityResult | sat.SatResult | table.TableResult
+    """
+    if engine not in ENGINES:
+        raise ValueError("Unknown engine: " + str(engine))
+
+    start = default_timer()
+    parsed_formulas, goal = parse_argument(formulas, goal)
+    solver_stats = None
+    if stats:
+        solver_stats = SolverStats()
+        solver_stats.add_time("parse", default_timer() - start)
+    budget = None
+    if max_nodes is not None or max_depth is not None or deadline is not None:
+        budget = Budget(max_nodes, max_depth, deadline)
+    if engine == "dfs":
+        return check_validity(parsed_formulas, goal, strategy, solver_stats, budget, regular)
+    if engine == "sat":
+        return sat.check_validity(parsed_formulas, goal, solver_stats, budget)
+    if engine in ("table", "auto"):
+        atoms = AtomTable()
+        for formula in parsed_formulas:
+            atoms.register(formula)
+        atoms.register(goal)
+        if engine == "table" or table.available(len(atoms.names)):
+            return table.check_validity(parsed_formulas, goal, atoms.names, solver_stats)
+    return TruthTree(parsed_formulas, goal, strategy, workers, solver_stats, budget, regular, full_tree)
+
+
+def solve_record(line, strategy=None, engine="tree", limits=None, regular=False, stats=False):
+    """
+    Solve one line of a batch file
+
+    :param line: JSON object with "premises" (a list of formulas or a single one) and "goal". Any "id" is
+                 copied to the result.
+    :type line: string_types
+    :param strategy: see runner
+    :param engine: see runner
+    :param limits: max_nodes, max_depth and deadline keyword arguments for runner
+    :type limits: dict
+    :param regular: see runner, the result then has "nodes_saved" when the engine skips formulas
+    :type regular: bool
+    :param stats: add the record's SolverStats.as_dict() to the result as "stats"
+    :type stats: bool
+    :return: JSON object with "valid" (null if undecided), "nodes" and "time" (seconds), or "error" if the
+             line could not be solved
+    :rtype: string_types
+    """
+    result = {}
+    start = default_timer()
+    try:
+        record = json.loads(line)
+        if "id" in record:
+            result["id"] = record["id"]
+        solved = runner(record.get("premises", []), record["goal"], strategy, engine, stats=stats, regular=regular,
+                        **(limits or {}))
+        result["valid"] = solved.is_valid()
+        result["nodes"] = solved.node_count()
+        if regular and isinstance(solved, (TruthTree, ValidityResult)):
+            result["nodes_saved"] = solved.nodes_saved
+        if stats:
+            result["stats"] = solved.stats.as_dict()
+    except (SyntaxError, TypeError, ValueError, KeyError, AttributeError) as exception:
+        result["error"] = type(exception).__name__ + ": " + str(exception)
+    result["time"] = default_timer() - start
+    return json.dumps(result, sort_keys=True)
+
+
+def run_batch(lines, output, strategy=None, engine="tree", workers=None, limits=None, regular=False, stats=False):
+    """
+    Solve every non-blank line of a JSONL batch and write one result line per record, in input order, as
+    soon as it is ready. Paying the interpreter and import cost once makes large exercise sets much cheaper
+    than one process per argument.
+
+    :param lines: see solve_record
+    :type lines: Iterable[string_types]
+    :param output: file-like object the results are written to
+    :param strategy: see runner
+    :param engine: see runner
+    :param workers: spread the records over this many processes instead of solving them here
+    :type workers: int
+    :param limits: see solve_record
+    :param regular: see solve_record
+    :param stats: see solve_record
+    """
+    lines = (line for line in lines if len(line.strip()) > 0)
+    solve = partial(solve_record, strategy=strategy, engine=engine, limits=limits, regular=regular, stats=stats)
+    if workers is None or workers < 2:
+        for line in lines:
+            output.write(solve(line) + "\n")
+            output.flush()
+        return
+
+    # only a few records per worker are read ahead, so results come out while the input is still arriving
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for line in lines:
+            pending.append(executor.submit(solve, line))
+            if len(pending) >= 2 * workers:
+                output.write(pending.popleft().result() + "\n")
+                output.flush()
+        while len(pending) > 0:
+            output.write(pending.popleft().result() + "\n")
+            output.flush()
 
 
 if __name__ == "__main__":
     PARSER = argparse.ArgumentParser(description="Generate Truth Table for a logical formula")
     PARSER.add_argument('formulas', metavar='formula', type=str, nargs="*", help='Logical formula')
-    PARSER.add_argument('goal', metavar='goal', type=str, help='Goal Formula')
+    PARSER.add_argument('goal', metavar='goal', type=str, nargs="?", help='Goal Formula')
+    PARSER.add_argument('--strategy', choices=sorted(STRATEGIES), default=OriginalOrder.name,
+                        help='Order in which formulas are broken')
+    PARSER.add_argument('--engine', choices=ENGINES, default="tree",
+                        help='Build the whole tree, stop at the first open branch (dfs), use a SAT solver (sat), '
+                             'evaluate the truth table with numpy (table) or pick the table when it is small (auto)')
+    PARSER.add_argument('--workers', type=int, default=None,
+                        help='Number of processes to build the tree with, or to solve batch records with')
+    PARSER.add_argument('--nodes', action='store_true', help='Print the number of nodes in the tree')
+    PARSER.add_argument('--max-nodes', type=int, default=None,
+                        help='Give up undecided rather than grow the tree past this many nodes')
+    PARSER.add_argument('--max-depth', type=int, default=None,
+                        help='Give up undecided rather than grow a branch deeper than this')
+    PARSER.add_argument('--deadline', type=float, default=None, help='Give up undecided after this many seconds')
+    PARSER.add_argument('--regular', action='store_true',
+                        help='Skip formulas already on a branch and splits a branch already satisfies')
+    PARSER.add_argument('--stats', action='store_true',
+                        help='Print rule applications, closure checks, nodes, depth and time spent per phase')
+    PARSER.add_argument('--batch', metavar='FILE', default=None,
+                        help='Solve {"premises": [...], "goal": ...} records from a JSONL file ("-" for stdin), '
+                             'writing one JSON result per line')
     PARSER_ARGS = PARSER.parse_args()
-    SHORT_TRUTH_TABLE = runner(PARSER_ARGS.formulas, PARSER_ARGS.goal)
-    if SHORT_TRUTH_TABLE.root.is_closed():
+
+    if PARSER_ARGS.batch is not None:
+        LIMITS = {"max_nodes": PARSER_ARGS.max_nodes, "max_depth": PARSER_ARGS.max_depth,
+                  "deadline": PARSER_ARGS.deadline}
+        if PARSER_ARGS.batch == "-":
+            run_batch(sys.stdin, sys.stdout, PARSER_ARGS.strategy, PARSER_ARGS.engine, PARSER_ARGS.workers, LIMITS,
+                      PARSER_ARGS.regular, PARSER_ARGS.stats)
+        else:
+            with open(PARSER_ARGS.batch) as BATCH_FILE:
+                run_batch(BATCH_FILE, sys.stdout, PARSER_ARGS.strategy, PARSER_ARGS.engine, PARSER_ARGS.workers,
+                          LIMITS, PARSER_ARGS.regular, PARSER_ARGS.stats)
+        sys.exit(0)
+
+    # the goal is the last positional argument, argparse gives every positional argument to formulas
+    if PARSER_ARGS.goal is None:
+        if len(PARSER_ARGS.formulas) == 0:
+            PARSER.error("the following arguments are required: goal")
+        PARSER_ARGS.goal = PARSER_ARGS.formulas.pop()
+    SHORT_TRUTH_TABLE = runner(PARSER_ARGS.formulas, PARSER_ARGS.goal, PARSER_ARGS.strategy, PARSER_ARGS.engine,
+                               PARSER_ARGS.workers, PARSER_ARGS.stats, PARSER_ARGS.max_nodes, PARSER_ARGS.max_depth,
+                               PARSER_ARGS.deadline, PARSER_ARGS.regular, full_tree=False)
+    if SHORT_TRUTH_TABLE.is_valid() is None:
+        print("Argument is undecided, the solver ran out of budget")
+    elif SHORT_TRUTH_TABLE.is_valid():
         print("Argument is valid")
     else:
         print("Argument is invalid")
+        if SHORT_TRUTH_TABLE.countermodel is not None:
+            print("Countermodel: " + ", ".join("%s=%s" % (atom, "T" if value else "F") for atom, value in
+                                               sorted(SHORT_TRUTH_TABLE.countermodel.items())))
+    if PARSER_ARGS.nodes:
+        print("Nodes: " + str(SHORT_TRUTH_TABLE.node_count()))
+    # only the tableau engines skip formulas, "auto" is one when it falls back to the tree
+    if PARSER_ARGS.regular and isinstance(SHORT_TRUTH_TABLE, (TruthTree, ValidityResult)):
+        print("Nodes saved by regularity: " + str(SHORT_TRUTH_TABLE.nodes_saved))
+    if PARSER_ARGS.stats:
+        print(SHORT_TRUTH_TABLE.stats.report())
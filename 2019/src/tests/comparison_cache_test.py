@@ -0,0 +1,54 @@
+from src.cli import TreeShell
+from src.treeformulas import TreeFormula, ComparisonCache, COMPARISONS
+import unittest
+
+
+def chain(connector, names):
+    arg = names[0]
+    for name in names[1:]:
+        arg = f"{connector}({arg},{name})"
+    return arg
+
+
+class TestComparisonCache(unittest.TestCase):
+    def test_eviction(self):
+        cache = ComparisonCache(max_entries=2)
+        cache.put("a", True)
+        cache.put("b", False)
+        self.assertTrue(cache.get("a"))
+        cache.put("c", True)
+        self.assertIsNone(cache.get("b"))
+        self.assertTrue(cache.get("a"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertEqual(cache.stats()["entries"], 2)
+
+    def test_hit_rate(self):
+        cache = ComparisonCache()
+        self.assertEqual(cache.hit_rate(), 0.0)
+        cache.put("a", False)
+        self.assertFalse(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.hit_rate(), 0.5)
+
+    def test_shared_between_formulas(self):
+        COMPARISONS.clear()
+        tf = TreeFormula("and(a,or(b,c))")
+        tf2 = TreeFormula("or(c,b)")
+        self.assertTrue(tf.in_decomposition(tf2))
+        hits = COMPARISONS.hits
+        # same arguments written differently are the same entry
+        self.assertTrue(TreeFormula("And( a, or(b,c))").in_decomposition(TreeFormula("or(c, b)")))
+        self.assertTrue(COMPARISONS.hits > hits)
+
+    def test_deep_chain(self):
+        names = ["p%d" % i for i in range(12)]
+        tf = TreeFormula(chain("and", names))
+        tf2 = TreeFormula(chain("and", list(reversed(names))))
+        tf3 = TreeFormula(chain("or", names))
+        self.assertEqual(tf, tf2)
+        self.assertNotEqual(tf, tf3)
+        self.assertTrue(tf.in_decomposition(TreeFormula("and(p3,p7)")))
+
+
+if __name__ == "__main__":
+    unittest.main()
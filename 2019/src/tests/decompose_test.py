@@ -84,6 +84,30 @@ class TestDecompose(unittest.TestCase):
         self.assertEqual(decom1, "or(not(a),b)", decom1)
         self.assertEqual(decom2, "or(a,not(b))", decom2)
 
+    def test_whitespace_and_case(self):
+        connector, decom1, decom2 = decompose_formula_argument(" And( not( a) , IF(b,c))")
+        self.assertEqual(connector, "and")
+        self.assertEqual(decom1, "not(a)")
+        self.assertEqual(decom2, "if(b,c)")
+
+    def test_unparseable(self):
+        self.assertEqual(decompose_formula_argument("and(a"), (None, None, None))
+
+    def test_tree_formula_decompose(self):
+        tf = TreeFormula("not(iff(a,b))")
+        connector, decom1, decom2 = tf.decompose()
+        self.assertEqual(connector, "iff")
+        self.assertEqual(decom1.arg, "and(not(a),b)")
+        self.assertEqual(decom2.arg, "and(a,not(b))")
+        self.assertIs(decom1.parsed, decom1.formula)
+        self.assertIs(tf.decompose()[1], decom1)
+
+    def test_tree_formula_decompose_iff(self):
+        tf = TreeFormula("iff(a,b)", "d")
+        decom1, decom2 = tf.decompose_iff()
+        self.assertEqual(decom1.arg, "or(not(a),b)")
+        self.assertEqual(decom2.arg, "or(a,not(b))")
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -88,5 +88,37 @@ class TestFormulaEquality(unittest.TestCase):
         tf2 = TreeFormula("and(a,b)")
         self.assertEqual(tf, tf2)
 
+    def test_iff_as_and(self):
+        tf = TreeFormula("iff(a,b)")
+        tf2 = TreeFormula("and(or(not(a),b),or(a,not(b)))")
+        self.assertEqual(tf, tf2)
+
+    def test_not_iff(self):
+        tf = TreeFormula("not(iff(a,b))")
+        self.assertEqual(tf, TreeFormula("iff(not(a),b)"))
+        self.assertEqual(tf, TreeFormula("iff(b,not(a))"))
+        self.assertEqual(tf, TreeFormula("or(and(a,not(b)),and(not(a),b))"))
+        self.assertNotEqual(tf, TreeFormula("iff(a,b)"))
+        self.assertEqual(TreeFormula("iff(not(a),not(b))"), TreeFormula("iff(a,b)"))
+
+    def test_nested_iff(self):
+        tf = TreeFormula("iff(and(a,b),c)")
+        tf2 = TreeFormula("iff(not(c),or(not(b),not(a)))")
+        self.assertEqual(tf, tf2)
+
+    def test_flatten_duplicates(self):
+        tf = TreeFormula("or(a,or(b,a))")
+        tf2 = TreeFormula("or(b,a)")
+        self.assertEqual(tf, tf2)
+        self.assertNotEqual(tf, TreeFormula("and(a,b)"))
+
+    def test_normal_form_cached(self):
+        tf = TreeFormula("if(a,not(and(b,c)))")
+        normal = tf.normal_form()
+        self.assertEqual(normal.tag, "or")
+        self.assertEqual(sorted(repr(argument) for argument in normal.arguments), ["not(a)", "not(b)", "not(c)"])
+        self.assertIs(tf.normal_form(), normal)
+        self.assertIs(TreeFormula("or(not(c),or(not(b),not(a)))").normal_form(), normal)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,57 @@
+from src.cli import TreeShell
+from src.treeformulas import TreeFormula, InternTable, INTERNED, COMPARISONS
+import gc
+import unittest
+
+
+class TestIntern(unittest.TestCase):
+    def test_shared_nodes(self):
+        table = InternTable()
+        a = table.intern("atom", "a")
+        b = table.intern("atom", "b")
+        node = table.intern("and", (a, b))
+        self.assertIs(table.intern("and", (a, b)), node)
+        swapped = table.intern("and", (b, a))
+        self.assertIsNot(swapped, node)
+        self.assertTrue(swapped.id > node.id)
+        self.assertIs(table.intern("atom", "a"), a)
+        self.assertEqual(len(table), 4)
+
+    def test_ids_not_reused(self):
+        table = InternTable()
+        node_id = table.intern("atom", "a").id
+        gc.collect()
+        self.assertEqual(len(table), 0)
+        self.assertNotEqual(table.intern("atom", "a").id, node_id)
+
+    def test_tree_formula_subformulas(self):
+        tf = TreeFormula("and(or(a,b),not(or(a, b)))")
+        tf2 = TreeFormula("Or( a,b)")
+        self.assertIs(tf.interned.arguments[0], tf2.interned)
+        self.assertIs(tf.interned.arguments[1].arguments[0], tf2.interned)
+        self.assertIs(tf.key, tf.interned)
+
+    def test_throwaway_queries_cached(self):
+        COMPARISONS.clear()
+        tf = TreeFormula("and(p,and(q,r))")
+        for i in range(5):
+            self.assertTrue(tf.in_decomposition(TreeFormula("and(r,q)", "d")))
+        entries = COMPARISONS.stats()["entries"]
+        hits = COMPARISONS.hits
+        self.assertTrue(tf.in_decomposition(TreeFormula("and(r,q)", "d")))
+        self.assertEqual(COMPARISONS.stats()["entries"], entries)
+        self.assertEqual(COMPARISONS.hits, hits + 1)
+
+    def test_unused_nodes_collected(self):
+        gc.collect()
+        before = len(INTERNED)
+        tf = TreeFormula("and(unused1,iff(unused2,unused3))")
+        tf.normal_form()
+        self.assertTrue(len(INTERNED) > before)
+        del tf
+        gc.collect()
+        self.assertEqual(len(INTERNED), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+from src.cli import TreeShell
+from src import util
+import unittest
+
+
+class TestClosingParenthesis(unittest.TestCase):
+    def test_closing(self):
+        self.assertEqual(util.closing_parenthesis("(and(a,b)),c"), 9)
+        self.assertEqual(util.closing_parenthesis("(a),(b)"), 2)
+
+    def test_unbalanced(self):
+        self.assertEqual(util.closing_parenthesis("((a)"), -1)
+
+
+class TestArgumentParse(unittest.TestCase):
+    def test_whitespace(self):
+        self.assertEqual(util.argument_parse(" and( a ,b) "), "and(a,b)")
+
+    def test_outer_parenthesis(self):
+        self.assertEqual(util.argument_parse("((and(a,b)))"), "and(a,b)")
+        self.assertEqual(util.argument_parse("( (a) )"), "a")
+
+    def test_separate_parenthesis(self):
+        self.assertEqual(util.argument_parse("(a),(b)"), "(a),(b)")
+
+
+class TestFindSeperation(unittest.TestCase):
+    def test_nested(self):
+        self.assertEqual(util.find_seperation("and(and(a,c),b),or(ab,b)"), 15)
+
+    def test_position_in_original_string(self):
+        self.assertEqual(util.find_seperation("and(a, c) , b"), 10)
+
+    def test_no_comma(self):
+        self.assertEqual(util.find_seperation("and(a,b)"), -1)
+
+    def test_main_connector(self):
+        self.assertEqual(util.find_main_connector(" (Or(a, b)) "), ("or", "a,b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,9 @@
 
 from __future__ import print_function, unicode_literals
 import argparse
+from collections import OrderedDict
+from threading import Lock
+import weakref
 from forseti.formula import Formula, Predicate, Symbol, Not, And, Or, If, Iff
 import forseti.parser
 from six import string_types
@@ -52,8 +55,17 @@ class TreeFormula(object):
         @effect: Create the TreeFormula of the description above
         """
         if formula is None:
-            formula = util.parse_formula(arg)
+            formula, error = util.parse_formula(arg)
         self.formula = formula
+        # placeholder formulas such as "Dummy" are parsed from arg, once
+        self.parsed = formula if isinstance(formula, Formula) else parse_argument(arg)
+        # the same node for every formula with the same parsed structure, which is what COMPARISONS is keyed on;
+        # the entries hold the nodes, so a structure asked about again keeps its node until the entry is evicted
+        self.interned = syntax_node(self.parsed) if self.parsed is not None else None
+        self.key = self.interned if self.interned is not None else arg
+        self.normal = None
+        self.decomposition = None
+        self.if_decomposition = None
         self.node = None
         self.arg = arg
         self.formula_id = vis_id
@@ -129,10 +141,25 @@ class TreeFormula(object):
         @return:
             Return up to two sets of formula where each set is a possible decompositon and a main connector
             Return the main connector of the decomposition (Either or, and, iff, None)
-            Return two formula that are decomposition of the formula using arguments returned from decompose_formula_argument
+            Return two formula that are decomposition of the formula using decompose_formula
+        @effect: The decomposition is kept in self.decomposition, later calls return the same objects
         """
-        main_connector, decom1, decom2 = decompose_formula_argument(self.arg)
-        return main_connector, TreeFormula(decom1, "Dummy"), TreeFormula(decom2, "Dummy")
+        if self.decomposition is None:
+            main_connector, decom1, decom2 = decompose_formula(self.parsed)
+            self.decomposition = main_connector, derived_formula(decom1), derived_formula(decom2)
+        return self.decomposition
+
+    def decompose_iff(self):
+        """
+        Returns the if form of a formula whose main connector is iff
+
+        @return: Return two formula, see decompose_iff_into_if
+        @effect: The two formula are kept in self.if_decomposition
+        """
+        if self.if_decomposition is None:
+            decom1, decom2 = iff_into_if(self.parsed)
+            self.if_decomposition = derived_formula(decom1), derived_formula(decom2)
+        return self.if_decomposition
 
     def __repr__(self):
         return f"{self.formula_id}: {self.formula}"
@@ -144,54 +171,23 @@ class TreeFormula(object):
             return False
         if (other is None):
             return False
-        if (self.arg == other.arg):
+        if (self.arg == other.arg or self.key == other.key):
             return True
-
-        # Finding the main connector of the formulas
-        original_connector1, v = util.find_main_connector(self.arg)
-        original_connector2, v = util.find_main_connector(other.arg)
-
-        # Checking the decomposition of both formulas
-        main_connector1, other_decom1, other_decom2 = self.decompose()
-        main_connector2, form2_decom1, form2_decom2 = other.decompose()
-
-        #Converting iff to either its or counter-part or it and counter-part
-        if main_connector1 == "iff" and main_connector2 == "or":
-            main_connector1 = "or"
-        if main_connector2 == "iff" and main_connector1 == "or":
-            main_connector2 = "or"
-        if main_connector1 == "iff" and main_connector2 == "and":
-            main_connector1 = "and"
-            v1, v2 = decompose_iff_into_if(self.arg)
-            other_decom1 = TreeFormula(v1, "Dummy")
-            other_decom2 = TreeFormula(v2, "Dummy")
-        if main_connector2 == "iff" and main_connector1 == "and":
-            main_connector2 = "and"
-            v1, v2 = decompose_iff_into_if(other.arg)
-            form2_decom1 = TreeFormula(v1, "Dummy")
-            form2_decom2 = TreeFormula(v2, "Dummy")
-        
-        #If main connector is different
-        if (main_connector1 != main_connector2):
+        if self.parsed is None or other.parsed is None:
             return False
+        return self.normal_form() is other.normal_form()
 
-        # Comparing literals
-        if main_connector1 is None:
-            return other_decom1.arg == form2_decom1.arg
-
-        #If decompositions are the same
-        if (other_decom1 == form2_decom1 and other_decom2 == form2_decom2) or (other_decom1 == form2_decom2 and other_decom2 == form2_decom1):
-            return True
+    def normal_form(self):
+        """
+        Canonical form of the formula, see normal_form. Two formula are equal when they share a canonical form.
 
-        #Try decomposing more
-        if (original_connector1 == "and" and original_connector2 == "and"):
-            return other.in_decomposition_lte(self) and self.in_decomposition_lte(other)
-        if (original_connector1 == "or" and original_connector2 == "or"):
-            return other.in_decomposition_lte(self) and self.in_decomposition_lte(other)
+        @return: the interned canonical form, None if the formula could not be parsed
+        @effect: The canonical form is computed on the first call and kept
+        """
+        if self.normal is None and self.parsed is not None:
+            self.normal = normal_form(self.parsed)
+        return self.normal
 
-        #Not equal
-        return False
-    
     def in_decomposition(self, other):
         """
         Check to see if other is in self's decomposition
@@ -211,9 +207,22 @@ class TreeFormula(object):
         @return: True if other is in self decomposition
                  False elsewise
         """
+        key = ("in", self.key, other.key)
+        found = COMPARISONS.get(key)
+        if found is None:
+            found = self.search_decomposition(other)
+            COMPARISONS.put(key, found)
+        return found
+
+    def search_decomposition(self, other):
+        """
+        Helper Function for in_decomposition_lte, searching self decomposition without looking in COMPARISONS
+
+        @return: True if other is in self decomposition
+        """
         # Decomposing self
         dummy, self_decom1, self_decom2 = self.decompose()
-        original_connector, dummy = util.find_main_connector(self.arg) 
+        original_connector = formula_connector(self.parsed)
 
         # Testing if other is equal to decom 1 or 2
         if other == self_decom1:
@@ -225,8 +234,8 @@ class TreeFormula(object):
             return True
 
         # Attempt to see if other is in self decomposition's decomposition 
-        original_connector1, dummy = util.find_main_connector(self_decom1.arg) 
-        original_connector2, dummy = util.find_main_connector(self_decom2.arg) 
+        original_connector1 = formula_connector(self_decom1.parsed)
+        original_connector2 = formula_connector(self_decom2.parsed)
         f1_in_decom1 = False
         f1_in_decom2 = False
         if original_connector1 == original_connector:
@@ -239,18 +248,18 @@ class TreeFormula(object):
             return True
 
         # Attempting to see if other decomposition's are in self decompositions (only if original connectors are the same)
-        f1_original_connector1, dummy = util.find_main_connector(other.arg) 
+        f1_original_connector1 = formula_connector(other.parsed)
         if f1_original_connector1 == original_connector:
             dummy, other_decom1, other_decom2 = other.decompose()
             return self.in_decomposition(other_decom1) and self.in_decomposition(other_decom2)
 
         # The two decompositions of iff
         if original_connector == "iff":
-            a1, a2 = decompose_iff_into_if(self.arg)
-            return TreeFormula(a1, "Dummy").in_decomposition(other) or TreeFormula(a2, "Dummy").in_decomposition(other) 
+            a1, a2 = self.decompose_iff()
+            return a1.in_decomposition(other) or a2.in_decomposition(other)
         if f1_original_connector1 == "iff":
-            dummy, a1, a2 = decompose_formula_argument(other.arg)
-            return self.in_decomposition(TreeFormula(a1, "Dummy")) and self.in_decomposition(TreeFormula(a2, "Dummy"),)
+            dummy, a1, a2 = other.decompose()
+            return self.in_decomposition(a1) and self.in_decomposition(a2)
 
         return False
  
@@ -289,6 +298,328 @@ class TreeFormula(object):
         if child_formula.valid:
             child_formula.mark_child_valid()
 
+class ComparisonCache(object):
+    """
+    Least recently used cache of TreeFormula.in_decomposition_lte results, keyed on the kind of query and the
+    key of both formula. One instance, COMPARISONS, is shared by every TreeFormula.
+    """
+    def __init__(self, max_entries=65536):
+        """
+        @param: max_entries is the number of results kept before the least recently used are evicted
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = Lock()
+
+    def get(self, key):
+        """
+        @return: the cached result, None on a miss
+        """
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value):
+        """
+        @effect: value is cached under key, evicting the least recently used result if the cache is full
+        """
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        @effect: every result and counter is dropped
+        """
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def hit_rate(self):
+        """
+        @return: fraction of lookups answered from the cache, 0 before the first lookup
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def stats(self):
+        """
+        @return: dictionary of the counters, the hit rate and the current number of entries
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hit_rate(),
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+            }
+
+COMPARISONS = ComparisonCache()
+
+class FormulaNode(object):
+    """
+    Immutable node of a formula shared through INTERNED: structurally identical formula are the same node, so
+    they compare and hash by identity and are told apart by a small integer id that is never reused.
+    """
+    __slots__ = ("id", "tag", "arguments", "negation", "__weakref__")
+
+    def __init__(self, node_id, tag, arguments):
+        """
+        @param: node_id is the id given by the InternTable
+        @param: tag is "atom", "not", "and", "or", "if" or "iff"
+        @param: arguments is the name of an atom, or a tuple of FormulaNode
+        """
+        self.id = node_id
+        self.tag = tag
+        self.arguments = arguments
+        # canonical form of the negation, filled in by negate_normal_form
+        self.negation = None
+
+    def __repr__(self):
+        if self.tag == "atom":
+            return self.arguments
+        return f"{self.tag}({','.join(repr(argument) for argument in self.arguments)})"
+
+class InternTable(object):
+    """
+    Hash-consing table handing out one FormulaNode per structure. Entries are weak references, so nodes no
+    TreeFormula uses any more are collected. One instance, INTERNED, is shared by every TreeFormula.
+    """
+    def __init__(self):
+        self.nodes = weakref.WeakValueDictionary()
+        self.next_id = 0
+        self.lock = Lock()
+
+    def intern(self, tag, arguments):
+        """
+        @param: tag and arguments are as in FormulaNode
+        @return: the node with that tag and arguments, created the first time it is asked for
+        """
+        if isinstance(arguments, string_types):
+            key = (tag, arguments)
+        else:
+            key = (tag, tuple(argument.id for argument in arguments))
+        with self.lock:
+            node = self.nodes.get(key)
+            if node is None:
+                node = FormulaNode(self.next_id, tag, arguments)
+                self.next_id += 1
+                self.nodes[key] = node
+            return node
+
+    def __len__(self):
+        return len(self.nodes)
+
+INTERNED = InternTable()
+
+def syntax_node(formula):
+    """
+    @param: formula is a parsed Formula
+    @return: the interned node with the same structure as formula
+    """
+    connector = formula_connector(formula)
+    if connector is None:
+        return INTERNED.intern("atom", repr(formula))
+    return INTERNED.intern(connector, tuple(syntax_node(arg) for arg in formula.args))
+
+def normal_form(formula, negated=False):
+    """
+    Canonical form of formula, the same for every formula TreeFormula.__eq__ considers equal: negations are
+    pushed down to the literals, if(a,b) becomes or(not(a),b), nested and and or are flattened with their
+    arguments ordered and without duplicates, and iff is rewritten as described in equivalence.
+
+    @param: formula is a parsed Formula
+    @param: negated is True to get the canonical form of not(formula)
+    @return: an interned FormulaNode tagged "atom", "not" (of an atom only), "and", "or" or "iff"
+    """
+    if isinstance(formula, Not):
+        return normal_form(formula.args[0], not negated)
+    if isinstance(formula, And) or isinstance(formula, Or):
+        connector = "and" if isinstance(formula, And) != negated else "or"
+        return junction(connector, [normal_form(arg, negated) for arg in formula.args])
+    if isinstance(formula, If):
+        arguments = [normal_form(formula.args[0], not negated), normal_form(formula.args[1], negated)]
+        return junction("and" if negated else "or", arguments)
+    if isinstance(formula, Iff):
+        return equivalence(normal_form(formula.args[0]), normal_form(formula.args[1]), negated)
+    literal = INTERNED.intern("atom", repr(formula))
+    return INTERNED.intern("not", (literal,)) if negated else literal
+
+def negate_normal_form(normal):
+    """
+    @param: normal is a canonical form from normal_form
+    @return: the canonical form of its negation
+    @effect: normal and its negation point at each other, so one is kept alive, and keeps its id, as long as
+             the other is
+    """
+    if normal.negation is not None:
+        return normal.negation
+    if normal.tag == "atom":
+        negation = INTERNED.intern("not", (normal,))
+    elif normal.tag == "not":
+        negation = normal.arguments[0]
+    elif normal.tag == "and":
+        negation = junction("or", [negate_normal_form(arg) for arg in normal.arguments])
+    elif normal.tag == "or":
+        negation = junction("and", [negate_normal_form(arg) for arg in normal.arguments])
+    else:
+        negation = equivalence(normal.arguments[0], normal.arguments[1], True)
+    normal.negation = negation
+    negation.negation = normal
+    return negation
+
+def node_id(node):
+    return node.id
+
+def junction(connector, arguments):
+    """
+    @param: connector is "and" or "or"
+    @param: arguments is a list of canonical forms
+    @return: canonical form of the arguments joined by connector, flattened, ordered by id and without
+             duplicates. or(and(a,b),and(not(a),not(b))) and and(or(not(a),b),or(a,not(b))) are recognized as
+             iff(a,b)
+    """
+    flat = set()
+    for argument in arguments:
+        if argument.tag == connector:
+            flat.update(argument.arguments)
+        else:
+            flat.add(argument)
+    if len(flat) == 1:
+        return flat.pop()
+    arguments = tuple(sorted(flat, key=node_id))
+
+    other = "or" if connector == "and" else "and"
+    if len(arguments) == 2 and all(argument.tag == other and len(argument.arguments) == 2 for argument in arguments):
+        first, second = arguments[0].arguments, arguments[1].arguments
+        if set(negate_normal_form(argument) for argument in first) == set(second):
+            return equivalence(first[0], first[1], connector == "and")
+    return INTERNED.intern(connector, arguments)
+
+def equivalence(left, right, negated=False):
+    """
+    iff(not(a),b) is iff(a,not(b)) and iff(not(a),not(b)) is iff(a,b), so each side is replaced by whichever of
+    it and its negation has the lower id, the sides are ordered by id, and if an odd number of negations were
+    taken off the last side is negated again. Both sides and their negations stay alive with the result, so
+    their ids, and with them the choice, do not change while the result is in use.
+
+    @param: left and right are canonical forms
+    @param: negated is True to get the canonical form of not(iff(left,right))
+    @return: canonical form of iff(left,right)
+    """
+    sides = []
+    for side in (left, right):
+        negation = negate_normal_form(side)
+        if negation.id < side.id:
+            side = negation
+            negated = not negated
+        sides.append(side)
+    sides.sort(key=node_id)
+    if negated:
+        sides[1] = negate_normal_form(sides[1])
+    return INTERNED.intern("iff", tuple(sides))
+
+def parse_argument(arg):
+    """
+    @param: arg is a string that can be parsed by forsetti parser, or None
+    @return: the parsed Formula, None if arg is None or cannot be parsed
+    """
+    if arg is None:
+        return None
+    try:
+        return forseti.parser.parse(arg)
+    except SyntaxError:
+        return None
+
+def formula_argument(formula):
+    """
+    @param: formula is a parsed Formula, or None
+    @return: formula written as a TreeFormula arg without whitespace, for example and(a,not(b))
+    """
+    if formula is None:
+        return None
+    return repr(formula).replace(' ', '')
+
+def derived_formula(formula):
+    """
+    @param: formula is a parsed Formula, or None
+    @return: a TreeFormula for a decomposition, sharing formula instead of parsing its arg again
+    """
+    if formula is None:
+        return TreeFormula(None, "Dummy")
+    return TreeFormula(formula_argument(formula), formula)
+
+def formula_connector(formula):
+    """
+    @param: formula is a parsed Formula, or None
+    @return: the main connector of formula (not, and, or, if, iff), None for literals
+    """
+    if isinstance(formula, Not):
+        return "not"
+    if isinstance(formula, And):
+        return "and"
+    if isinstance(formula, Or):
+        return "or"
+    if isinstance(formula, If):
+        return "if"
+    if isinstance(formula, Iff):
+        return "iff"
+    return None
+
+def decompose_formula(formula):
+    """
+    @param: formula is a parsed Formula, or None
+    @return:
+        Return the main connector of the decomposition (and, or, iff, None)
+        and the two decompositions as Formula, the second None if formula is a literal
+        Return None, None, None if formula is None
+    """
+    if formula is None:
+        return None, None, None
+    if isinstance(formula, Not):
+        inner = formula.args[0]
+        if isinstance(inner, And):
+            return "or", Not(inner.args[0]), Not(inner.args[1])
+        if isinstance(inner, Or):
+            return "and", Not(inner.args[0]), Not(inner.args[1])
+        if isinstance(inner, Not):
+            return None, inner.args[0], None
+        if isinstance(inner, If):
+            return "and", inner.args[0], Not(inner.args[1])
+        if isinstance(inner, Iff):
+            return "iff", And(Not(inner.args[0]), inner.args[1]), And(inner.args[0], Not(inner.args[1]))
+        return None, formula, None
+    if isinstance(formula, And):
+        return "and", formula.args[0], formula.args[1]
+    if isinstance(formula, Or):
+        return "or", formula.args[0], formula.args[1]
+    if isinstance(formula, If):
+        return "or", Not(formula.args[0]), formula.args[1]
+    if isinstance(formula, Iff):
+        return "iff", And(formula.args[0], formula.args[1]), And(Not(formula.args[0]), Not(formula.args[1]))
+    return None, formula, None
+
+def iff_into_if(formula):
+    """
+    @param: formula is a parsed Formula in the form iff(a,b)
+    @return: or(not(a),b) and or(a,not(b)) as Formula
+    """
+    return Or(Not(formula.args[0]), formula.args[1]), Or(formula.args[0], Not(formula.args[1]))
+
 def decompose_formula_argument(arg):
     """
     @param: arg is a string contained in TreeFormula's arg parameter
@@ -298,49 +629,8 @@ def decompose_formula_argument(arg):
         The two remaining strings are the decomposition arguments for TreeFormula 
         Return None, None, None if arg is not supported
     """
-    arg = util.argument_parse(arg)
-    main_connector, arg = util.find_main_connector(arg)
-
-    # arg is a literal
-    if main_connector is None:
-        return None, arg, None
-    
-    if main_connector == "not":
-        arg = util.argument_parse(arg)
-        inner_parenthesis_index = arg.find('(')
-        if(inner_parenthesis_index == -1):
-            return None, f"not({arg})", None
-        else:
-            inner_connector = arg[0: inner_parenthesis_index].lower()
-            arg = arg[inner_parenthesis_index + 1: len(arg) - 1]
-            if inner_connector == "and":
-                seperator = util.find_seperation(arg)
-                return "or", f"not({arg[0: seperator]})", f"not({arg[seperator+1: len(arg)]})"
-            if inner_connector == "or":
-                seperator = util.find_seperation(arg)
-                return "and", f"not({arg[0: seperator]})", f"not({arg[seperator+1: len(arg)]})"
-            if inner_connector == "not":
-                return None, arg, None
-            if inner_connector == "if":
-                seperator = util.find_seperation(arg)
-                return "and", arg[0: seperator], f"not({arg[seperator+1 : len(arg)]})"
-            if inner_connector == "iff":
-                seperator = util.find_seperation(arg)
-                return "iff", f"and(not({arg[0: seperator]}),{arg[seperator+1 : len(arg)]})", f"and({arg[0: seperator]},not({arg[seperator+1 : len(arg)]}))"
-            return None, None, None
-    if main_connector == "and":
-        seperator = util.find_seperation(arg)
-        return main_connector, arg[0: seperator], arg[seperator+1: len(arg)]
-    if main_connector == "or":
-        seperator = util.find_seperation(arg)
-        return main_connector, arg[0: seperator], arg[seperator+1: len(arg)]
-    if main_connector == "if":
-        seperator = util.find_seperation(arg)
-        return "or", f"not({arg[0:seperator]})", arg[seperator+1: len(arg)]
-    if main_connector == "iff":
-        seperator = util.find_seperation(arg)
-        return "iff", f"and({arg[0: seperator]},{arg[seperator+1: len(arg)]})", f"and(not({arg[0: seperator]}),not({arg[seperator+1: len(arg)]}))"
-    return None, None, None
+    main_connector, decom1, decom2 = decompose_formula(parse_argument(arg))
+    return main_connector, formula_argument(decom1), formula_argument(decom2)
 
 def decompose_iff_into_if(arg):
     """
@@ -352,12 +642,5 @@ def decompose_iff_into_if(arg):
             or(not(a),b) 
             or(a,not(b))
     """
-    arg = util.argument_parse(arg)
-    first_parenthesis_index = arg.find('(')
-
-    # Seperating the main connector and it's arguments
-    main_connector = arg[0: first_parenthesis_index].lower()
-    arg = arg[first_parenthesis_index + 1: len(arg) - 1]
-    seperator = util.find_seperation(arg)
-    return f"or(not({arg[0: seperator]}),{arg[seperator+1: len(arg)]})", f"or({arg[0: seperator]},not({arg[seperator+1: len(arg)]}))"
-
+    decom1, decom2 = iff_into_if(parse_argument(arg))
+    return formula_argument(decom1), formula_argument(decom2)
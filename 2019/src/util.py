@@ -72,11 +72,30 @@ def argument_parse(arg):
     @return: arg with the spaces and parenthesis around arg removed
     """
     a = arg.replace(' ','')
-    while a[0] == '(' and a[len(arg) - 1] == ')':
+    # only a matching pair wraps the whole argument, the parenthesis of "(a),(b)" are kept
+    while len(a) > 1 and a[0] == '(' and closing_parenthesis(a) == len(a) - 1:
         a = a[1 : len(a) - 1]
     return a
 
 
+def closing_parenthesis(arg):
+    """
+    Helper Function for argument_parse
+
+    @param: arg is a string starting with an opening parenthesis
+    @return: the index of the parenthesis closing it, or -1 if it is never closed
+    """
+    open_parenthesis = 0
+    for i in range(len(arg)):
+        if arg[i] == '(':
+            open_parenthesis += 1
+        elif arg[i] == ')':
+            open_parenthesis -= 1
+            if open_parenthesis == 0:
+                return i
+    return -1
+
+
 def find_seperation(arg):
     """
     Helper Function for decompose
@@ -0,0 +1,12 @@
+"""
+Benchmarks for the 2016 solver and the 2019 interface. Run them from the repository root, for example
+``python -m benchmarks.memory``.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("2016", "2019"):
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
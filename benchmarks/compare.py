@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Compare two result files written by benchmarks.run, usually from two commits.
+
+    python -m benchmarks.compare base.json new.json [--threshold 1.1]
+"""
+
+from __future__ import print_function, unicode_literals
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as handle:
+        report = json.load(handle)
+    return report, dict(((result["name"], result["size"]), result) for result in report["results"])
+
+
+def compare(base, new, threshold):
+    """
+
+    :param base: results keyed on (name, size)
+    :param new: results keyed on (name, size)
+    :param threshold: new / base time ratio above which a benchmark counts as slower
+    :return: one (name, size, base seconds, new seconds, ratio, flag) row per benchmark in both files
+    """
+    rows = []
+    for key in sorted(set(base) & set(new)):
+        before = base[key]["seconds"]
+        after = new[key]["seconds"]
+        ratio = after / before if before > 0 else float("inf")
+        if ratio > threshold:
+            flag = "slower"
+        elif ratio < 1.0 / threshold:
+            flag = "faster"
+        else:
+            flag = ""
+        rows.append((key[0], key[1], before, after, ratio, flag))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=1.1,
+                        help="time ratio beyond which a benchmark is reported slower or faster")
+    args = parser.parse_args()
+
+    base_report, base = load(args.base)
+    new_report, new = load(args.new)
+    print("base %s\nnew  %s" % (base_report.get("commit"), new_report.get("commit")))
+    slower = 0
+    for name, size, before, after, ratio, flag in compare(base, new, args.threshold):
+        print("%-40s %5d %10.4fs %10.4fs %7.2fx %s" % (name, size, before, after, ratio, flag))
+        if flag == "slower":
+            slower += 1
+    for name, size in sorted(set(base) ^ set(new)):
+        print("%-40s %5d only in %s" % (name, size, "base" if (name, size) in base else "new"))
+    sys.exit(1 if slower > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
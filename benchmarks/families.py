@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Scalable argument families. Every generator returns premises and a goal as strings in the functional
+notation both solvers parse, with binary connectives only.
+"""
+
+from __future__ import unicode_literals
+import random
+
+
+def chain(connective, operands):
+    """
+    Nest operands right to left under a binary connective, e.g. and(A, and(B, C))
+
+    :param connective:
+    :type connective: str
+    :param operands:
+    :type operands: List[str]
+    :rtype: str
+    """
+    text = operands[-1]
+    for operand in reversed(operands[:-1]):
+        text = "%s(%s, %s)" % (connective, operand, text)
+    return text
+
+
+def implication_chain(length):
+    """
+    A0, if(A0, A1), ..., if(An-1, An) therefore An
+
+    :param length:
+    :type length: int
+    """
+    premises = ["if(A%d, A%d)" % (i, i + 1) for i in range(length)]
+    premises.append("A0")
+    return premises, "A%d" % length
+
+
+def pigeonhole(holes):
+    """
+    holes + 1 pigeons each sit in some hole and no hole holds two of them. The premises are inconsistent,
+    so the argument is valid whatever the goal is.
+
+    :param holes:
+    :type holes: int
+    """
+    pigeons = holes + 1
+    premises = [chain("or", ["P%dH%d" % (pigeon, hole) for hole in range(holes)]) for pigeon in range(pigeons)]
+    for hole in range(holes):
+        for first in range(pigeons):
+            for second in range(first + 1, pigeons):
+                premises.append("not(and(P%dH%d, P%dH%d))" % (first, hole, second, hole))
+    return premises, "Z"
+
+
+def disjunctions(count):
+    """
+    or(P0, Q0), ..., or(Pn-1, Qn-1) therefore A, whose tree doubles in size with every premise and never closes
+
+    :param count:
+    :type count: int
+    """
+    return ["or(P%d, Q%d)" % (i, i) for i in range(count)], "A"
+
+
+def random_cnf(variables, clauses=None, seed=0):
+    """
+    Random 3-CNF with a clause per premise, at the 4.26 clauses per variable threshold unless clauses is given
+
+    :param variables:
+    :type variables: int
+    :param clauses:
+    :type clauses: int
+    :param seed:
+    :type seed: int
+    """
+    generator = random.Random(seed)
+    if clauses is None:
+        clauses = int(round(4.26 * variables))
+    premises = []
+    for i in range(clauses):
+        literals = []
+        for variable in generator.sample(range(variables), 3):
+            literal = "V%d" % variable
+            literals.append(literal if generator.random() < 0.5 else "not(%s)" % literal)
+        premises.append(chain("or", literals))
+    return premises, "Z"
+
+
+def nested_biconditionals(depth):
+    """
+    iff(A1, iff(A2, ... An)) therefore the same chain with its atoms reversed, which is valid because iff is
+    associative and commutative
+
+    :param depth:
+    :type depth: int
+    """
+    atoms = ["A%d" % i for i in range(depth)]
+    return [chain("iff", atoms)], chain("iff", list(reversed(atoms)))
+
+
+FAMILIES = {
+    "implication_chain": implication_chain,
+    "pigeonhole": pigeonhole,
+    "disjunctions": disjunctions,
+    "random_cnf": random_cnf,
+    "nested_biconditionals": nested_biconditionals,
+}
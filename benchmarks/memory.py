@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the memory held by a solved TruthTree with the CompactTree copy of it at fixed tree sizes. The copy is
+made from the finished tree, which it releases as it goes: the peak column is what solving and copying cost,
+the retained one what keeping the result costs.
+
+    python -m benchmarks.memory [--sizes 8 10 12]
+"""
+
+from __future__ import print_function, unicode_literals
+import argparse
+import gc
+import tracemalloc
+from benchmarks.families import disjunctions
+import truthtrees
+
+
+def retained(build):
+    """
+
+    :param build: called with no arguments, its return value is kept alive while measuring
+    :return: the object build returned, the bytes allocated for it that are still live and the most bytes
+             that were live at once while building it
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, after - before, peak - before
+
+
+def measure(count):
+    premises, goal = disjunctions(count)
+    tree, tree_bytes, tree_peak = retained(lambda: truthtrees.runner(premises, goal))
+    nodes = tree.node_count()
+    del tree
+
+    def build_compact():
+        return truthtrees.CompactTree(truthtrees.runner(premises, goal).root, release=True)
+
+    compact, compact_bytes, compact_peak = retained(build_compact)
+    return {"premises": count, "nodes": nodes, "tree_bytes": tree_bytes, "tree_peak": tree_peak,
+            "compact_bytes": compact_bytes, "compact_peak": compact_peak}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[6, 8, 10, 12],
+                        help="number of disjunctions, the tree has 2^(n+1) - 1 nodes")
+    args = parser.parse_args()
+    print("%8s %8s %14s %14s %14s %14s" % ("premises", "nodes", "TruthTree", "peak", "CompactTree", "peak"))
+    for count in args.sizes:
+        row = measure(count)
+        print("%8d %8d %14d %14d %14d %14d" % (row["premises"], row["nodes"], row["tree_bytes"], row["tree_peak"],
+                                               row["compact_bytes"], row["compact_peak"]))
+
+
+if __name__ == "__main__":
+    main()
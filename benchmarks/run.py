@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Time both solvers on the scalable families and write the results as JSON.
+
+    python -m benchmarks.run [--output results.json] [--repeat 3] [--filter 2016.]
+    python -m benchmarks.compare base.json results.json
+"""
+
+from __future__ import print_function, unicode_literals
+import argparse
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+from timeit import default_timer
+import benchmarks
+from benchmarks.families import FAMILIES, chain
+import truthtrees
+from src.cli import TreeShell
+from src import treeformulas
+from src.treeformulas import TreeFormula
+
+# argument families and the sizes the 2016 solver is timed at, the trees grow exponentially in some of them
+SIZES_2016 = {
+    "implication_chain": (100, 200, 400, 800),
+    "pigeonhole": (2, 3),
+    "random_cnf": (3, 4, 5),
+    "nested_biconditionals": (4, 6, 8),
+}
+
+
+def atoms(count):
+    return ["a%d" % i for i in range(count)]
+
+
+def solve_2016(family, size):
+    premises, goal = FAMILIES[family](size)
+
+    def run():
+        tree = truthtrees.runner(premises, goal)
+        return {"valid": tree.is_valid(), "nodes": tree.node_count()}
+    return run
+
+
+def clear_caches_2019():
+    """
+    Forget the comparisons memoized across calls, so every run does the work being measured. Commits from
+    before the cache have nothing to clear.
+    """
+    comparisons = getattr(treeformulas, "COMPARISONS", None)
+    if comparisons is not None:
+        comparisons.clear()
+
+
+def equality_2019(size):
+    def run():
+        clear_caches_2019()
+        first = TreeFormula(chain("and", atoms(size)))
+        second = TreeFormula(chain("and", list(reversed(atoms(size)))))
+        return {"equal": first == second}
+    return run
+
+
+def biconditional_equality_2019(size):
+    premises, goal = FAMILIES["nested_biconditionals"](size)
+
+    def run():
+        clear_caches_2019()
+        first = TreeFormula(premises[0])
+        second = TreeFormula(goal)
+        return {"equal": first == second}
+    return run
+
+
+def in_decomposition_2019(size):
+    def run():
+        clear_caches_2019()
+        conjunction = TreeFormula(chain("and", atoms(size)))
+        last = TreeFormula(atoms(size)[-1])
+        return {"found": conjunction.in_decomposition(last)}
+    return run
+
+
+def verification_2019(size):
+    """
+    TreeShell session that writes out every conjunct of a conjunction, marks each one's parent and closes
+    the branch against a negated conjunct
+
+    :param size:
+    :type size: int
+    """
+    names = atoms(size)
+
+    def run():
+        clear_caches_2019()
+        shell = TreeShell(stdout=io.StringIO())
+        shell.do_add_root_formula(chain("and", names))
+        shell.do_add_root_formula("not(%s)" % names[-1])
+        for i, name in enumerate(names):
+            shell.do_add_formula(name)
+            shell.do_mark_parent("%d 1" % (i + 3))
+        shell.do_close("%d 2" % (size + 2))
+        return {"closed": shell.do_check_all_closed("") == "True"}
+    return run
+
+
+def cases():
+    """
+
+    :return: (name, size, function to time) for every benchmark
+    """
+    for family in sorted(SIZES_2016):
+        for size in SIZES_2016[family]:
+            yield "2016.runner.%s" % family, size, solve_2016(family, size)
+    for size in (3, 4, 5):
+        yield "2019.eq.commuted_conjunction", size, equality_2019(size)
+    for size in (2, 3, 4):
+        yield "2019.eq.nested_biconditionals", size, biconditional_equality_2019(size)
+    for size in (8, 16, 32):
+        yield "2019.in_decomposition.conjunction", size, in_decomposition_2019(size)
+    for size in (4, 8, 12):
+        yield "2019.verify.conjunction", size, verification_2019(size)
+
+
+def git_commit():
+    """
+
+    :return: the commit being benchmarked, with -dirty appended when the working tree has changes
+    """
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=benchmarks.ROOT).decode().strip()
+        status = subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"],
+                                         cwd=benchmarks.ROOT).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + "-dirty" if status else commit
+
+
+def run_benchmarks(repeat, name_filter=None, stream=sys.stderr):
+    results = []
+    for name, size, function in cases():
+        if name_filter is not None and name_filter not in name:
+            continue
+        runs = []
+        info = None
+        for i in range(repeat):
+            start = default_timer()
+            info = function()
+            runs.append(default_timer() - start)
+        results.append({"name": name, "size": size, "seconds": min(runs), "runs": runs, "info": info})
+        print("%-40s %5d %10.4fs" % (name, size, min(runs)), file=stream)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", help="file to write the JSON results to, standard output if omitted")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, the fastest is reported")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this text")
+    args = parser.parse_args()
+
+    report = {
+        "commit": git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": run_benchmarks(args.repeat, args.filter),
+    }
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()